@@ -0,0 +1,107 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Configuration
+DEFAULT_MAX_ENTRIES = 4096  # Least recently used answers are evicted above this count
+DEFAULT_SIMILARITY_THRESHOLD = 0.97  # Minimum cosine similarity between query embeddings
+
+
+def context_fingerprint(matches: Sequence[dict]) -> Tuple[Tuple[str, str], ...]:
+    """
+    Return the identity of a retrieved context: the ordered (vector id, page_hash) pairs.
+
+    Re-ingesting a page with different content changes its page_hash, so answers built
+    on the old content stop matching.
+    """
+    return tuple((match.get("id", ""), match.get("page_hash") or "") for match in matches)
+
+
+class SemanticAnswerCache:
+    """
+    Bounded in-memory cache of generated answers keyed by query embedding.
+
+    A lookup hits when a cached query is at least `threshold` cosine-similar to the new
+    one and was answered from exactly the same retrieved pages. Embeddings live in one
+    preallocated matrix, so a lookup is a single matrix-vector product.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 threshold: float = DEFAULT_SIMILARITY_THRESHOLD):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._matrix = None  # (max_entries, dim) unit-normalized query embeddings
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._entries = OrderedDict()  # slot -> (fingerprint, answer), in least recently used order
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, query_embedding: List[float], fingerprint: Tuple) -> Optional[str]:
+        """
+        Return a cached answer for a similar query over the same context, or None.
+
+        Args:
+            query_embedding (List[float]): Embedding of the new query.
+            fingerprint (Tuple): context_fingerprint() of the pages retrieved for it.
+        """
+        query = self._normalize(query_embedding)
+        with self._lock:
+            if self._matrix is not None and self._matrix.shape[1] == query.shape[0] and self._entries:
+                similarities = self._matrix @ query
+                similarities[~self._valid] = -np.inf
+                candidates = np.flatnonzero(similarities >= self.threshold)
+                for slot in candidates[np.argsort(-similarities[candidates])]:
+                    cached_fingerprint, answer = self._entries[int(slot)]
+                    if cached_fingerprint == fingerprint:
+                        self._entries.move_to_end(int(slot))
+                        self.hits += 1
+                        return answer
+            self.misses += 1
+            return None
+
+    def put(self, query_embedding: List[float], fingerprint: Tuple, answer: str):
+        """Store an answer, evicting the least recently used entry when the cache is full."""
+        query = self._normalize(query_embedding)
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != query.shape[0]:
+                # First entry, or the embedding model changed: start over with the new dimension
+                self._matrix = np.zeros((self.max_entries, query.shape[0]), dtype=np.float32)
+                self._valid[:] = False
+                self._entries.clear()
+                self._free_slots = list(range(self.max_entries - 1, -1, -1))
+            if not self._free_slots:
+                slot, _ = self._entries.popitem(last=False)
+                self._valid[slot] = False
+                self._free_slots.append(slot)
+            slot = self._free_slots.pop()
+            self._matrix[slot] = query
+            self._valid[slot] = True
+            self._entries[slot] = (fingerprint, answer)
+
+    def clear(self):
+        """Drop every cached answer."""
+        with self._lock:
+            self._valid[:] = False
+            self._entries.clear()
+            self._free_slots = list(range(self.max_entries - 1, -1, -1))
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and the number of cached answers."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
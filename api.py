@@ -1,9 +1,21 @@
-from fastapi import FastAPI, HTTPException
+import json
+from contextlib import asynccontextmanager
+
+import anyio
+import openai
+import requests
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from typing import List, Optional
+from requests.adapters import HTTPAdapter
 from agents.document_selection_agent import DocumentSelectionAgent
 from agents.arxiv_agent import ArxivAgent
 from agents.web_search_agent import WebSearchAgent
-from agents.rag_agent import rag_query_answer
+from agents.rag_agent import answer_cache, query_embedding_cache_stats, rag_query_answer, rag_query_stream
+from fetch_cache import get_fetch_cache
+from local_vector_index import VECTOR_BACKEND, open_local_index
 from pinecone import Pinecone
 import pandas as pd
 
@@ -11,16 +23,52 @@ import pandas as pd
 temp_df = pd.DataFrame(columns=["document_selected", "question", "response"])
 
 
-# Initialize FastAPI app
-app = FastAPI()
-
-# Initialize Pinecone and index
-pc = Pinecone(api_key="")
-index = pc.Index("team9-project4-vector")
+# Configuration
+PINECONE_API_KEY = ""
+INDEX_NAME = "team9-project4-vector"
+HTTP_POOL_SIZE = 64  # Pooled outbound HTTP connections per host
+PINECONE_POOL_THREADS = 16
+BLOCKING_THREADS = 100  # Worker threads for blocking SDK calls moved off the event loop
 
 # SerpAPI Key
 serp_api_key = ""
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create pooled clients and agents once per process and share them across requests.
+    """
+    # Pooled HTTP session for OpenAI, arXiv and page fetches
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    openai.requestssession = session
+
+    # Initialize Pinecone and index (or the on-disk local index with VECTOR_BACKEND=local)
+    if VECTOR_BACKEND == "local":
+        index = open_local_index(INDEX_NAME)
+    else:
+        pc = Pinecone(api_key=PINECONE_API_KEY, pool_threads=PINECONE_POOL_THREADS)
+        index = pc.Index(INDEX_NAME, pool_threads=PINECONE_POOL_THREADS)
+
+    # Blocking calls run in this thread pool, so size it for concurrent research sessions
+    anyio.to_thread.current_default_thread_limiter().total_tokens = BLOCKING_THREADS
+
+    app.state.session = session
+    app.state.index = index
+    app.state.document_agent = DocumentSelectionAgent(index)
+    app.state.arxiv_agent = ArxivAgent(session=session)
+    try:
+        yield
+    finally:
+        session.close()
+
+
+# Initialize FastAPI app
+app = FastAPI(lifespan=lifespan)
+
 # Input models
 class DocumentSelectionInput(BaseModel):
     selected_document_index: int
@@ -36,28 +84,30 @@ class WebSearchInput(BaseModel):
 
 class RAGInput(BaseModel):
     question: str
+    documents: Optional[List[str]] = None  # Document titles to search; all documents when omitted
 
 
 # API endpoints
 @app.get("/document_selection")
-def get_documents():
+async def get_documents(request: Request):
     """
-    Endpoint to fetch available documents for selection.
+    Endpoint to fetch available documents for selection, with the catalog entry (page
+    count, ingest timestamp) of each document under "details".
     """
-    agent = DocumentSelectionAgent(index)
-    documents = agent.fetch_documents()
+    agent = request.app.state.document_agent
+    documents = await run_in_threadpool(agent.fetch_documents)
     if not documents:
         raise HTTPException(status_code=404, detail="No documents found.")
-    return {"documents": documents}
+    details = await run_in_threadpool(agent.fetch_document_details)
+    return {"documents": documents, "details": details}
 
 
 @app.post("/document_selection")
-def select_document(input: DocumentSelectionInput):
+async def select_document(input: DocumentSelectionInput, request: Request):
     """
     Endpoint to select a document based on the user's choice.
     """
-    agent = DocumentSelectionAgent(index)
-    documents = agent.fetch_documents()
+    documents = await run_in_threadpool(request.app.state.document_agent.fetch_documents)
 
     # Ensure the provided index is valid
     if input.selected_document_index < 0 or input.selected_document_index >= len(documents):
@@ -68,28 +118,28 @@ def select_document(input: DocumentSelectionInput):
 
 
 @app.post("/arxiv_research")
-def arxiv_research(input: ArxivInput):
+async def arxiv_research(input: ArxivInput, request: Request):
     """
     Endpoint to perform Arxiv research based on a document's content.
     """
-    agent = ArxivAgent()
     if not input.document_content:
         raise HTTPException(status_code=400, detail="Document content is required for Arxiv research.")
 
-    result = agent.search_arxiv(input.document_content)
+    result = await run_in_threadpool(request.app.state.arxiv_agent.search_arxiv, input.document_content)
     return {"research_result": result}
 
 
 @app.post("/web_search")
-def web_search(input: WebSearchInput):
+async def web_search(input: WebSearchInput, request: Request):
     """
     Endpoint to perform a web search using the provided query.
     """
     if not input.query:
         raise HTTPException(status_code=400, detail="Query is required for web search.")
 
-    agent = WebSearchAgent(query=input.query, serp_api_key=serp_api_key)
-    search_result = agent.search_web()
+    search_result = await run_in_threadpool(
+        WebSearchAgent, query=input.query, serp_api_key=serp_api_key, session=request.app.state.session
+    )
     if search_result:
         return {"web_search_result": search_result}
     else:
@@ -97,17 +147,59 @@ def web_search(input: WebSearchInput):
 
 
 @app.post("/rag_query")
-def rag_query(input: RAGInput):
+async def rag_query(input: RAGInput, request: Request):
     """
-    Endpoint to answer a question using RAG (retrieval-augmented generation).
+    Endpoint to answer a question using RAG (retrieval-augmented generation), optionally
+    limited to the selected documents.
     """
     if not input.question:
         raise HTTPException(status_code=400, detail="Question is required for RAG query.")
 
-    answer = rag_query_answer(query=input.question, top_k=5, index=index)
+    answer = await run_in_threadpool(
+        rag_query_answer, query=input.question, top_k=5, index=request.app.state.index, documents=input.documents
+    )
     return {"answer": answer}
 
 
+@app.post("/rag_query/stream")
+async def rag_query_stream_endpoint(input: RAGInput, request: Request):
+    """
+    Endpoint to answer a question using RAG, streamed as server-sent events.
+
+    Emits a "sources" event with the retrieved pages, then one "token" event per answer
+    fragment, then "done" (or "error").
+    """
+    if not input.question:
+        raise HTTPException(status_code=400, detail="Question is required for RAG query.")
+
+    def events():
+        # A sync generator: Starlette advances it in the thread pool, off the event loop
+        for event, data in rag_query_stream(
+            query=input.question, index=request.app.state.index, top_k=5, documents=input.documents
+        ):
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/cache_stats")
+async def cache_stats(request: Request):
+    """
+    Endpoint to report hit/miss counters of the page fetch, arXiv result, query embedding and answer caches.
+    """
+    stats = await run_in_threadpool(get_fetch_cache().stats)
+    return {
+        "fetch_cache": stats,
+        "arxiv_results": request.app.state.arxiv_agent.cache_stats(),
+        "query_embeddings": query_embedding_cache_stats(),
+        "answers": answer_cache.stats(),
+    }
+
+
 # Run the FastAPI app with Uvicorn
 if __name__ == "__main__":
     import uvicorn
@@ -1,16 +1,72 @@
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from contextlib import closing
+from io import BytesIO
+from typing import Dict, Iterator, List
+
 import requests
-from typing import List, Dict
-from bs4 import BeautifulSoup
+from fetch_cache import get_fetch_cache
+
+# Configuration
+ARXIV_PAGE_SIZE = 100  # Results requested per API call when max_results is large
+ARXIV_REQUEST_INTERVAL = 3.0  # Seconds between API calls, per arXiv's rate limit guidance
+ARXIV_TIMEOUT = 30
+MAX_QUERY_TERMS = 32  # Document content is reduced to this many leading terms
+RESULT_CACHE_SIZE = 256  # Search results kept in memory (least recently used are evicted)
+RESULT_CACHE_TTL = 60 * 60  # Seconds a cached search result is served
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+OPENSEARCH = "{http://a9.com/-/spec/opensearch/1.1/}"
+
+# Shared by every agent in the process so concurrent searches still respect the rate limit
+_request_lock = threading.Lock()
+_last_request_at = 0.0
+
+
+def normalize_query(query: str, max_terms: int = MAX_QUERY_TERMS) -> str:
+    """Lowercase the query, drop punctuation and keep at most max_terms terms."""
+    terms = re.findall(r"\w+", query.lower())
+    return " ".join(terms[:max_terms])
+
+
+def _wait_for_rate_limit(interval: float):
+    """Block until interval seconds have passed since the previous arXiv API call."""
+    global _last_request_at
+    with _request_lock:
+        delay = _last_request_at + interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        _last_request_at = time.monotonic()
 
 
 class ArxivAgent:
-    def __init__(self, base_url="http://export.arxiv.org/api/query"):
+    def __init__(self, base_url="http://export.arxiv.org/api/query", session: requests.Session = None,
+                 page_size: int = ARXIV_PAGE_SIZE, request_interval: float = ARXIV_REQUEST_INTERVAL,
+                 cache_size: int = RESULT_CACHE_SIZE, cache_ttl: float = RESULT_CACHE_TTL):
         self.base_url = base_url
+        # Reuse pooled connections across searches; the API passes its shared session
+        self.session = session or requests.Session()
+        self.page_size = page_size
+        self.request_interval = request_interval
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        # Normalized query and max_results -> (stored_at, papers), in least recently used order
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     def search_arxiv(self, query: str, max_results: int = 5) -> List[Dict[str, str]]:
         """
         Search for research papers on Arxiv based on a query.
-        
+
+        Results are cached by normalized query and max_results for cache_ttl seconds. If a
+        request fails (e.g. a 503 or rate-limit reply), the papers received so far are
+        returned but not cached, so the next search retries.
+
         Args:
             query (str): Search query, such as keywords or document topics.
             max_results (int): Number of results to return.
@@ -18,56 +74,128 @@ class ArxivAgent:
         Returns:
             List[Dict[str, str]]: List of dictionaries containing paper info.
         """
-        # Prepare the query parameters
-        params = {
-            "search_query": f"all:{query}",
-            "start": 0,
-            "max_results": max_results
-        }
-        
-        # Send the request to Arxiv API
-        response = requests.get(self.base_url, params=params)
-        
-        if response.status_code == 200:
-            # Parse the XML response
-            papers = self.parse_arxiv_response(response.text)
+        key = (normalize_query(query), max_results)
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None and now - cached[0] < self.cache_ttl:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return list(cached[1])
+            self.cache_misses += 1
+
+        papers = []
+        try:
+            for paper in self.iter_papers(key[0], max_results):
+                papers.append(paper)
+        except (requests.RequestException, ET.ParseError) as e:
+            print(f"Failed to fetch results from Arxiv: {e}")
             return papers
-        else:
-            print(f"Failed to fetch results from Arxiv. Status code: {response.status_code}")
-            return []
+
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic(), papers)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return list(papers)
+
+    def iter_papers(self, query: str, max_results: int = 5) -> Iterator[Dict[str, str]]:
+        """
+        Yield papers matching a query, requesting them in pages of at most page_size.
+
+        Each page is parsed while it downloads, so the first papers are available before
+        the whole feed has arrived. Consecutive requests are spaced request_interval apart.
+
+        Args:
+            query (str): Search query, such as keywords or document topics.
+            max_results (int): Number of results to return.
+
+        Yields:
+            Dict[str, str]: Paper info (title, summary, authors, link).
+
+        Raises:
+            requests.HTTPError: If arXiv answers a request with a non-200 status.
+        """
+        start = 0
+        while start < max_results:
+            page_size = min(self.page_size, max_results - start)
+            params = {
+                "search_query": f"all:{query}",
+                "start": start,
+                "max_results": page_size
+            }
+
+            # Send the request to Arxiv API
+            _wait_for_rate_limit(self.request_interval)
+            response = self.session.get(self.base_url, params=params, timeout=ARXIV_TIMEOUT, stream=True)
+            with closing(response):
+                if response.status_code != 200:
+                    raise requests.HTTPError(
+                        f"Arxiv returned status code {response.status_code}", response=response
+                    )
+                response.raw.decode_content = True
+                feed = {}
+                received = 0
+                for paper in self._iter_feed(response.raw, feed):
+                    received += 1
+                    yield paper
+
+            start += received
+            # A short page means the feed is exhausted
+            if received < page_size or start >= feed.get("total_results", max_results):
+                return
 
     def parse_arxiv_response(self, xml_response: str) -> List[Dict[str, str]]:
         """
         Parse the XML response from Arxiv API to extract relevant paper information.
-        
+
         Args:
             xml_response (str): XML response from Arxiv API.
 
         Returns:
             List[Dict[str, str]]: List of dictionaries with paper details.
         """
-        import xml.etree.ElementTree as ET
-        
-        root = ET.fromstring(xml_response)
-        papers = []
-        
-        for entry in root.findall("{http://www.w3.org/2005/Atom}entry"):
-            title = entry.find("{http://www.w3.org/2005/Atom}title").text
-            summary = entry.find("{http://www.w3.org/2005/Atom}summary").text
-            link = entry.find("{http://www.w3.org/2005/Atom}id").text
-            authors = ", ".join(
-                author.find("{http://www.w3.org/2005/Atom}name").text
-                for author in entry.findall("{http://www.w3.org/2005/Atom}author")
-            )
-            
-            papers.append({
-                "title": title.strip(),
-                "summary": summary.strip(),
-                "authors": authors,
-                "link": link
-            })
-        
-        return papers
+        return list(self._iter_feed(BytesIO(xml_response.encode("utf-8")), {}))
+
+    def _iter_feed(self, source, feed: dict) -> Iterator[Dict[str, str]]:
+        """
+        Incrementally parse an Atom feed, yielding each entry once its closing tag is read.
+
+        Args:
+            source: Binary file-like object with the feed.
+            feed (dict): Receives feed-level values ("total_results") as they are parsed.
+        """
+        for _, element in ET.iterparse(source, events=("end",)):
+            if element.tag == f"{OPENSEARCH}totalResults" and element.text:
+                feed["total_results"] = int(element.text)
+            elif element.tag == f"{ATOM}entry":
+                title = element.findtext(f"{ATOM}title", "")
+                summary = element.findtext(f"{ATOM}summary", "")
+                link = element.findtext(f"{ATOM}id", "")
+                authors = ", ".join(
+                    author.findtext(f"{ATOM}name", "")
+                    for author in element.findall(f"{ATOM}author")
+                )
+                # Release the parsed entry so memory stays flat for large feeds
+                element.clear()
+
+                yield {
+                    "title": title.strip(),
+                    "summary": summary.strip(),
+                    "authors": authors,
+                    "link": link
+                }
+
+    def cache_stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and the number of cached search results."""
+        with self._cache_lock:
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "hit_rate": self.cache_hits / lookups if lookups else 0.0,
+                "entries": len(self._cache),
+            }
 
     def fetch_page_content(self, url: str) -> str:
         """
@@ -80,13 +208,8 @@ class ArxivAgent:
             str: Extracted text content from the page.
         """
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            # Extract content from the main article text
-            content = "\n".join(p.text for p in soup.find_all("p"))
-            return content
+            # Extract content from the main article text, reusing cached text when still valid
+            return get_fetch_cache().fetch_text(url, session=self.session, timeout=10)
         except requests.RequestException as e:
             print(f"Failed to fetch content from {url}: {e}")
             return "Content not available"
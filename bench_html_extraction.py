@@ -0,0 +1,70 @@
+"""Micro-benchmark: streamed ParagraphExtractor vs. the BeautifulSoup paragraph path.
+
+Run with `python bench_html_extraction.py`. No network access is needed; pages are
+generated locally and fed to the streaming extractor in network-sized chunks.
+"""
+
+import sys
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+from html_extraction import MAX_TEXT_CHARS, STREAM_CHUNK_SIZE, extract_paragraphs
+
+REPEATS = 5
+
+
+def build_page(paragraphs: int) -> str:
+    """Build an HTML page with navigation, scripts and the given number of paragraphs."""
+    body = []
+    for i in range(paragraphs):
+        body.append(f"<div class='row'><span>nav {i}</span><a href='/l/{i}'>link</a></div>")
+        body.append(f"<p>Paragraph {i} about capital markets, <b>liquidity</b> and regulation. " + "lorem ipsum " * 20 + "</p>")
+        if i % 50 == 0:
+            body.append("<script>var x = '<p>not text</p>';</script>")
+    return "<html><head><title>Bench</title></head><body>" + "".join(body) + "</body></html>"
+
+
+def beautifulsoup_path(html: str) -> str:
+    """The previous extraction: full tree parse, then join every <p>."""
+    soup = BeautifulSoup(html, "html.parser")
+    return "\n".join(p.text for p in soup.find_all("p"))
+
+
+def streamed_path(html: str, max_chars: int) -> str:
+    """The new extraction: incremental parse of network-sized chunks under a character budget."""
+    chunks = (html[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(html), STREAM_CHUNK_SIZE))
+    return extract_paragraphs(chunks, max_chars)
+
+
+def measure(func, *args):
+    """Return (best seconds, peak traced bytes, output length) over REPEATS runs."""
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        output = func(*args)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, len(output)
+
+
+def main():
+    print(f"{'page size':>10} {'path':<28} {'ms':>9} {'peak MB':>9} {'chars':>9}")
+    for paragraphs in (100, 1000, 10000):
+        html = build_page(paragraphs)
+        size = f"{len(html) / 1024:.0f} KB"
+        for label, func, args in (
+            ("BeautifulSoup (full)", beautifulsoup_path, (html,)),
+            ("streamed (no budget)", streamed_path, (html, sys.maxsize)),
+            (f"streamed ({MAX_TEXT_CHARS} chars)", streamed_path, (html, MAX_TEXT_CHARS)),
+        ):
+            seconds, peak, chars = measure(func, *args)
+            print(f"{size:>10} {label:<28} {seconds * 1000:9.1f} {peak / 1e6:9.1f} {chars:9d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Benchmark: latency added by BM25 keyword search + reciprocal-rank fusion in retrieve_context.
+
+Run with `python bench_hybrid_retrieval.py`. A synthetic corpus is indexed into a temporary
+keyword index, content store and LocalVectorIndex; retrieve_context is then timed with and without the
+keyword query. Against Pinecone the keyword search also overlaps the network round trip
+of the vector query, so the added latency there is at most what is measured here.
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+import content_store
+import keyword_index
+import rag_agent
+from content_store import ContentStore
+from keyword_index import KeywordIndex
+from local_vector_index import LocalVectorIndex
+
+PAGES = 10000
+WORDS_PER_PAGE = 300
+VOCABULARY = 20000
+DIMENSION = 1536
+QUERIES = 200
+TOP_K = 5
+
+
+def build_corpus(rng):
+    """Pages of Zipf-distributed words, some carrying ticker and statute-number tokens."""
+    vocabulary = np.array([f"w{i}" for i in range(VOCABULARY)])
+    pages = []
+    for i in range(PAGES):
+        words = vocabulary[np.minimum(rng.zipf(1.2, WORDS_PER_PAGE), VOCABULARY) - 1].tolist()
+        if i % 50 == 0:
+            words += [f"TICK{i}", f"s.{i % 97}(b)", f"Table {i % 13}.{i % 7}"]
+        pages.append(" ".join(words))
+    queries = [
+        f"What does TICK{i} report in section s.{i % 97}(b) about w{rng.integers(1, 200)} and w{rng.integers(1, 2000)}?"
+        for i in rng.choice(np.arange(0, PAGES, 50), QUERIES)
+    ]
+    return pages, queries
+
+
+def percentiles(samples):
+    samples = np.array(samples) * 1000
+    return f"p50 {np.percentile(samples, 50):6.2f} ms   p95 {np.percentile(samples, 95):6.2f} ms"
+
+
+def main():
+    rng = np.random.default_rng(0)
+    pages, queries = build_corpus(rng)
+    embeddings = rng.normal(size=(QUERIES, DIMENSION)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as path:
+        keywords = KeywordIndex(Path(path) / "keywords.sqlite3")
+        start = time.perf_counter()
+        for offset in range(0, PAGES, 500):
+            keywords.add_pages(
+                (f"doc_{i}", "doc", i, "", pages[i]) for i in range(offset, min(offset + 500, PAGES))
+            )
+        print(f"Indexed {PAGES} pages for keyword search in {time.perf_counter() - start:.1f} s")
+        keyword_index._default_index = keywords
+
+        # Hits are hydrated from the content store; keep it in the temporary directory too
+        contents = ContentStore(Path(path) / "content.sqlite3")
+        contents.put_many({"id": f"doc_{i}", "document": "doc", "page_num": i, "text": pages[i]} for i in range(PAGES))
+        content_store._default_store = contents
+
+        vectors = LocalVectorIndex(Path(path) / "vectors", dimension=DIMENSION)
+        for offset in range(0, PAGES, 1000):
+            batch = rng.normal(size=(1000, DIMENSION)).astype(np.float32)
+            vectors.upsert([(f"doc_{offset + j}", batch[j], {"document": "doc", "page_num": offset + j}) for j in range(1000)])
+
+        # Warm up both paths (thread pool, SQLite page cache)
+        rag_agent.retrieve_context(vectors, embeddings[0], TOP_K, keyword_query=queries[0])
+
+        timings = {"keyword search only": [], "vector only": [], "hybrid (vector + keyword + RRF)": []}
+        hits = 0
+        for query, embedding in zip(queries, embeddings):
+            start = time.perf_counter()
+            keywords.search(query, TOP_K * rag_agent.HYBRID_CANDIDATES)
+            timings["keyword search only"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            rag_agent.retrieve_context(vectors, embedding, TOP_K)
+            timings["vector only"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            context = rag_agent.retrieve_context(vectors, embedding, TOP_K, keyword_query=query)
+            timings["hybrid (vector + keyword + RRF)"].append(time.perf_counter() - start)
+            ticker = query.split()[2]
+            hits += any(page["id"] == f"doc_{ticker[4:]}" for page in context)
+
+        for label, samples in timings.items():
+            print(f"{label:<34} {percentiles(samples)}")
+        added = np.median(timings["hybrid (vector + keyword + RRF)"]) - np.median(timings["vector only"])
+        print(f"Median latency added by hybrid retrieval: {added * 1000:.2f} ms")
+        print(f"Queries whose ticker page was retrieved: {hits}/{QUERIES} (random vectors alone: ~0)")
+
+        vectors.close()
+        contents.close()
+        keywords.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Benchmark: recall and memory of quantized LocalVectorIndex search against exact float32 search.
+
+Run with `python bench_vector_quantization.py`. Vectors are synthetic and clustered (like
+embeddings of related pages), stored once in a temporary index directory and searched with
+each quantization setting; recall@k is measured against the exact float32 results.
+"""
+
+import tempfile
+import time
+
+import numpy as np
+
+from local_vector_index import LocalVectorIndex
+
+VECTORS = 20000
+DIMENSION = 1536
+CLUSTERS = 200
+QUERIES = 100
+TOP_K = 10
+SETTINGS = [
+    ("float32 (exact)", None, 1),
+    ("float16", "float16", 1),
+    ("float16 + rerank x4", "float16", 4),
+    ("int8", "int8", 1),
+    ("int8 + rerank x4", "int8", 4),
+    ("pq 96x8", "pq", 1),
+    ("pq 96x8 + rerank x4", "pq", 4),
+    ("pq 96x8 + rerank x10", "pq", 10),
+]
+
+
+def build_vectors(rng):
+    """Clustered unit vectors plus queries drawn near stored vectors."""
+    centers = rng.normal(size=(CLUSTERS, DIMENSION)).astype(np.float32)
+    vectors = centers[rng.integers(0, CLUSTERS, VECTORS)] + 0.8 * rng.normal(size=(VECTORS, DIMENSION)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.choice(VECTORS, QUERIES, replace=False)] + 0.02 * rng.normal(size=(QUERIES, DIMENSION)).astype(np.float32)
+    return vectors, queries
+
+
+def search(index, queries):
+    """Return the result id lists and the mean query latency in milliseconds."""
+    start = time.perf_counter()
+    results = [[m["id"] for m in index.query(vector=q, top_k=TOP_K)["matches"]] for q in queries]
+    return results, (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    vectors, queries = build_vectors(rng)
+
+    with tempfile.TemporaryDirectory() as path:
+        index = LocalVectorIndex(path, dimension=DIMENSION, quantization=None)
+        for start in range(0, VECTORS, 1000):
+            index.upsert([(str(i), vectors[i]) for i in range(start, min(start + 1000, VECTORS))])
+        exact, _ = search(index, queries)
+        index.close()
+
+        print(f"{VECTORS} x {DIMENSION} vectors, {QUERIES} queries, recall@{TOP_K}")
+        print(f"{'setting':<24} {'bytes/vector':>12} {'memory MB':>10} {'recall':>8} {'ms/query':>9}")
+        for label, quantization, rerank_factor in SETTINGS:
+            index = LocalVectorIndex(path, dimension=DIMENSION, quantization=quantization, rerank_factor=rerank_factor)
+            if not index._quantization_ready() and quantization:
+                index.train_quantization()  # Product quantization; the saved codebooks serve later settings
+            search(index, queries[:1])  # Encodes the stored vectors outside the timed run
+            results, latency = search(index, queries)
+            recall = np.mean([len(set(r) & set(e)) / TOP_K for r, e in zip(results, exact)])
+            if index._compressed is not None:
+                memory = index._compressed.codes[:VECTORS].nbytes + index._compressed.scales[:VECTORS].nbytes
+            else:
+                memory = index._matrix[:VECTORS].nbytes + index._norms[:VECTORS].nbytes
+            print(f"{label:<24} {memory / VECTORS:12.0f} {memory / 1e6:10.1f} {recall:8.3f} {latency:9.2f}")
+            index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Token-bounded chunking of Docling page records before embedding.
+
+Chunks are built per page from the page's layout segments, so a chunk never spans two
+pages and always knows its parent page. Tables are kept whole unless a single table is
+larger than a chunk, in which case it is split between rows with the header repeated.
+"""
+
+import hashlib
+import logging
+import re
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # Chunk sizes are then counted in words
+    tiktoken = None
+
+# Configuration
+CHUNK_TOKENS = 350  # Maximum tokens per chunk
+CHUNK_OVERLAP_TOKENS = 50  # Tokens of the previous text repeated at the start of the next chunk
+TOKENIZER_MODEL = "text-embedding-ada-002"
+
+_log = logging.getLogger(__name__)
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?;:])\s+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+class _WordTokenizer:
+    """Fallback when tiktoken is not installed: whitespace-delimited words count as tokens."""
+
+    def encode(self, text: str) -> List[str]:
+        return re.findall(r"\S+\s*", text)
+
+    def decode(self, tokens: List[str]) -> str:
+        return "".join(tokens)
+
+
+_tokenizer = None
+
+
+def get_tokenizer():
+    """Return the tokenizer of the embedding model (or the word-count fallback)."""
+    global _tokenizer
+    if _tokenizer is None:
+        if tiktoken is not None:
+            _tokenizer = tiktoken.encoding_for_model(TOKENIZER_MODEL)
+        else:
+            _log.warning("tiktoken is not installed; chunk sizes are counted in words")
+            _tokenizer = _WordTokenizer()
+    return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    """Return the number of embedding-model tokens in `text`."""
+    return len(get_tokenizer().encode(text))
+
+
+def _table_text(data) -> str:
+    """Render Docling table data (rows of cells or cell dicts) as one line per row."""
+    if not data:
+        return ""
+    lines = []
+    for row in data:
+        if isinstance(row, dict):
+            lines.append(str(row.get("text", "")))
+        elif isinstance(row, (list, tuple)):
+            lines.append(" | ".join(str(cell.get("text", "")) if isinstance(cell, dict) else str(cell) for cell in row))
+        else:
+            lines.append(str(row))
+    return "\n".join(line for line in lines if line.strip())
+
+
+def page_blocks(page: dict) -> List[Tuple[str, str]]:
+    """
+    Return a page as ordered ("text" | "table", text) blocks, one per Docling segment.
+
+    Pages without segments (legacy artifacts) are split into paragraphs of `contents`.
+    """
+    blocks = []
+    for segment in page.get("segments") or []:
+        label = str(segment.get("label") or segment.get("type") or "").lower()
+        kind = "table" if "table" in label else "text"
+        text = (segment.get("text") or "").strip()
+        if kind == "table" and not text:
+            text = _table_text(segment.get("data") or page.get("cells"))
+        if text:
+            blocks.append((kind, text))
+    if not blocks:
+        blocks = [("text", part.strip()) for part in _PARAGRAPH_BREAK.split(page.get("contents") or "") if part.strip()]
+    return blocks
+
+
+def _split_block(kind: str, text: str, max_tokens: int, tokenizer) -> Iterator[Tuple[str, int]]:
+    """Yield (piece, token count) pieces of one block, each at most max_tokens long."""
+    tokens = len(tokenizer.encode(text))
+    if tokens <= max_tokens:
+        yield text, tokens
+        return
+
+    if kind == "table":
+        # Split between rows and repeat the header row in every piece
+        def fit(lines, lines_tokens):
+            if lines_tokens <= max_tokens:
+                yield "\n".join(lines), lines_tokens
+            else:  # A single row longer than a chunk
+                yield from _split_block("text", "\n".join(lines), max_tokens, tokenizer)
+
+        header, *rows = text.split("\n")
+        header_tokens = len(tokenizer.encode(header))
+        piece, piece_tokens = [header], header_tokens
+        for row in rows:
+            row_tokens = len(tokenizer.encode(row))
+            if len(piece) > 1 and piece_tokens + row_tokens > max_tokens:
+                yield from fit(piece, piece_tokens)
+                piece, piece_tokens = [header], header_tokens
+            piece.append(row)
+            piece_tokens += row_tokens
+        yield from fit(piece, piece_tokens)
+        return
+
+    sentences = _SENTENCE_BREAK.split(text)
+    if len(sentences) > 1:
+        for sentence in sentences:
+            yield from _split_block("text", sentence, max_tokens, tokenizer)
+        return
+
+    # A single sentence longer than a chunk: cut it into token windows
+    encoded = tokenizer.encode(text)
+    for start in range(0, len(encoded), max_tokens):
+        window = encoded[start:start + max_tokens]
+        yield tokenizer.decode(window), len(window)
+
+
+def chunk_page(page: dict, parent_id: str, max_tokens: int = CHUNK_TOKENS,
+               overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> List[dict]:
+    """
+    Split one page record into token-bounded chunks.
+
+    Consecutive blocks are packed into a chunk until the next one would not fit. When a
+    chunk is cut after text, its last overlap_tokens tokens start the next chunk.
+
+    Args:
+        page (dict): Page record with "segments" and/or "contents", "page_hash" and "extra".
+        parent_id (str): Vector id of the page; chunk ids are "<parent_id>#<n>".
+        max_tokens (int): Maximum tokens per chunk.
+        overlap_tokens (int): Tokens of text carried into the following chunk.
+
+    Returns:
+        List[dict]: Chunks with id, parent_id, chunk_index, text, token_count, kinds and
+        content_hash (changes whenever the chunk's page or text changes).
+    """
+    tokenizer = get_tokenizer()
+    page_hash = page.get("page_hash") or ""
+    chunks = []
+    parts, kinds, tokens = [], set(), 0
+
+    def flush():
+        text = "\n".join(parts)
+        index = len(chunks)
+        chunks.append({
+            "id": f"{parent_id}#{index}",
+            "parent_id": parent_id,
+            "chunk_index": index,
+            "text": text,
+            "token_count": tokens,
+            "kinds": "+".join(sorted(kinds)),
+            "content_hash": hashlib.sha256(f"{page_hash}:{index}:{text}".encode("utf-8")).hexdigest(),
+        })
+
+    for kind, text in page_blocks(page):
+        for piece, piece_tokens in _split_block(kind, text, max_tokens, tokenizer):
+            if parts and tokens + piece_tokens > max_tokens:
+                last_kind, last_piece = previous
+                flush()
+                parts, kinds, tokens = [], set(), 0
+                if last_kind == "text" and overlap_tokens and overlap_tokens + piece_tokens <= max_tokens:
+                    tail = tokenizer.encode(last_piece)[-overlap_tokens:]
+                    parts, kinds, tokens = [tokenizer.decode(tail).strip()], {"text"}, len(tail)
+            parts.append(piece)
+            kinds.add(kind)
+            tokens += piece_tokens
+            previous = (kind, piece)
+    if parts:
+        flush()
+    return chunks
+
+
+def iter_chunks(pages: Iterable[dict], parent_id: Callable[[dict], str], max_tokens: int = CHUNK_TOKENS,
+                overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> Iterator[Tuple[dict, dict]]:
+    """
+    Lazily chunk a stream of page records, one page at a time.
+
+    Args:
+        pages (Iterable[dict]): Page records, e.g. from page_artifacts.iter_page_records.
+        parent_id (Callable[[dict], str]): Returns the vector id of a page.
+
+    Yields:
+        Tuple[dict, dict]: (page, chunk) pairs in page order.
+    """
+    for page in pages:
+        for chunk in chunk_page(page, parent_id(page), max_tokens, overlap_tokens):
+            yield page, chunk
@@ -0,0 +1,134 @@
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable
+
+# Configuration
+# Written by ingestion and read by the API: both must point at the same file
+CONTENT_STORE_PATH = Path(os.environ.get("CONTENT_STORE_PATH", "./content_store.sqlite3"))
+MAX_LOOKUP_PARAMS = 500  # SQLite limits the number of bound parameters per statement
+
+
+class ContentStore:
+    """
+    Full text and table data of indexed pages and chunks, kept in SQLite and keyed by
+    vector id.
+
+    Vector metadata only carries small filterable fields; retrieval hydrates the text of
+    its hits from this store with one batched lookup.
+    """
+
+    def __init__(self, path: Path = CONTENT_STORE_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS contents (
+                id TEXT PRIMARY KEY,
+                document TEXT NOT NULL,
+                page_num INTEGER,
+                page_hash TEXT,
+                text TEXT NOT NULL,
+                table_json TEXT
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_contents_document ON contents (document)")
+        self._conn.commit()
+
+    def put_many(self, records: Iterable[dict]) -> int:
+        """
+        Insert or replace content records.
+
+        Args:
+            records (Iterable[dict]): Dicts with id, document, page_num, page_hash, text and
+                optionally table (JSON-serialisable table data).
+
+        Returns:
+            int: Number of records written.
+        """
+        rows = [
+            (
+                record["id"],
+                record["document"],
+                record.get("page_num"),
+                record.get("page_hash") or "",
+                record.get("text") or "",
+                json.dumps(record["table"]) if record.get("table") else None,
+            )
+            for record in records
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO contents (id, document, page_num, page_hash, text, table_json) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def get_many(self, vector_ids: Iterable[str]) -> Dict[str, dict]:
+        """
+        Look up the content of several vectors.
+
+        Args:
+            vector_ids (Iterable[str]): Vector ids to look up.
+
+        Returns:
+            Dict[str, dict]: Maps each stored id to {"document", "page_num", "page_hash",
+            "text", "table"}; ids without content are left out.
+        """
+        vector_ids = list(dict.fromkeys(vector_ids))
+        found = {}
+        with self._lock:
+            for start in range(0, len(vector_ids), MAX_LOOKUP_PARAMS):
+                chunk = vector_ids[start:start + MAX_LOOKUP_PARAMS]
+                rows = self._conn.execute(
+                    "SELECT id, document, page_num, page_hash, text, table_json FROM contents "
+                    f"WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for vector_id, document, page_num, page_hash, text, table_json in rows:
+                    found[vector_id] = {
+                        "document": document,
+                        "page_num": page_num,
+                        "page_hash": page_hash,
+                        "text": text,
+                        "table": json.loads(table_json) if table_json else None,
+                    }
+        return found
+
+    def delete(self, vector_ids: Iterable[str]):
+        """Remove content by vector id."""
+        vector_ids = list(vector_ids)
+        with self._lock:
+            for start in range(0, len(vector_ids), MAX_LOOKUP_PARAMS):
+                chunk = vector_ids[start:start + MAX_LOOKUP_PARAMS]
+                self._conn.execute(f"DELETE FROM contents WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM contents").fetchone()[0]
+
+    def close(self):
+        """Close the underlying SQLite connection."""
+        self._conn.close()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_content_store() -> ContentStore:
+    """Return the process-wide content store shared by ingestion and retrieval."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ContentStore()
+    return _default_store
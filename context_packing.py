@@ -0,0 +1,148 @@
+"""Assembly of retrieved chunks into a diverse, token-budgeted prompt context.
+
+Retrieval over-fetches candidates; maximal marginal relevance then picks a subset that
+is relevant to the query but not redundant with what was already picked, using the
+vectors returned by the vector query, and the picks are packed into a token budget.
+"""
+
+import hashlib
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from chunking import count_tokens
+
+# Configuration
+CONTEXT_TOKEN_BUDGET = 2500  # Maximum tokens of retrieved context in a prompt
+OVERFETCH_FACTOR = 3  # Candidates retrieved per context slot
+MMR_LAMBDA = 0.7  # Weight of relevance against redundancy (1.0 ranks by relevance only)
+DUPLICATE_THRESHOLD = 0.95  # Candidates this similar to a selected one are dropped outright
+
+_log = logging.getLogger(__name__)
+
+
+def _unit_rows(vectors: List[Optional[Sequence[float]]], dimension: int) -> np.ndarray:
+    """Stack vectors into L2-normalised rows; missing vectors become zero rows."""
+    matrix = np.zeros((len(vectors), dimension), dtype=np.float32)
+    for i, vector in enumerate(vectors):
+        if vector is not None and len(vector):
+            matrix[i] = vector
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _relevance(candidates: List[Dict]) -> np.ndarray:
+    """Retrieval scores scaled to [0, 1]; candidates without a score rank by position."""
+    n = len(candidates)
+    scores = np.array([c.get("score", n - i) for i, c in enumerate(candidates)], dtype=np.float64)
+    low, high = scores.min(), scores.max()
+    if high == low:
+        return np.ones(n)
+    return (scores - low) / (high - low)
+
+
+def mmr_select(candidates: List[Dict], query_vector: Sequence[float], k: int,
+               mmr_lambda: float = MMR_LAMBDA, duplicate_threshold: float = DUPLICATE_THRESHOLD) -> List[int]:
+    """
+    Return the indices of up to k candidates chosen by maximal marginal relevance.
+
+    Each step picks the candidate maximising
+    mmr_lambda * relevance - (1 - mmr_lambda) * max similarity to the picks so far.
+    Relevance is the candidate's retrieval score scaled to [0, 1]; similarity is the cosine
+    of the candidates' "values" vectors. MMR only orders the candidates: the scaled scores
+    say nothing about absolute relevance, so candidates are dropped only as near-duplicates
+    (similarity of at least duplicate_threshold to a pick). Candidates without a vector
+    (keyword-only hits) are only treated as duplicates of picks with identical content.
+
+    Args:
+        candidates (List[Dict]): Retrieved items, best first, with optional "score" and "values".
+        query_vector (Sequence[float]): Query embedding, for the vector dimension.
+        k (int): Maximum number of picks.
+        mmr_lambda (float): Relevance weight in [0, 1].
+        duplicate_threshold (float): Similarity at or above which a candidate is dropped.
+
+    Returns:
+        List[int]: Candidate indices in pick order.
+    """
+    if not candidates or k <= 0:
+        return []
+    rows = _unit_rows([c.get("values") or None for c in candidates], len(query_vector))
+    similarity = rows @ rows.T
+
+    # Identical non-empty content counts as a duplicate whether or not vectors are known
+    groups = {}
+    for i, candidate in enumerate(candidates):
+        content = " ".join((candidate.get("content") or "").split())
+        if content:
+            groups.setdefault(hashlib.sha1(content.encode("utf-8")).digest(), []).append(i)
+    for group in groups.values():
+        if len(group) > 1:
+            similarity[np.ix_(group, group)] = 1.0
+
+    relevance = _relevance(candidates)
+    remaining = list(range(len(candidates)))
+    redundancy = np.full(len(candidates), -np.inf)
+    picks = []
+    while remaining and len(picks) < k:
+        if picks:
+            scores = mmr_lambda * relevance[remaining] - (1 - mmr_lambda) * np.maximum(redundancy[remaining], 0.0)
+            best = remaining[int(np.argmax(scores))]
+        else:
+            best = remaining[int(np.argmax(relevance[remaining]))]
+        picks.append(best)
+        remaining.remove(best)
+        redundancy = np.maximum(redundancy, similarity[:, best])
+        remaining = [i for i in remaining if redundancy[i] < duplicate_threshold]
+    return picks
+
+
+def pack_context(candidates: List[Dict], query_vector: Sequence[float], top_k: int,
+                 format_item: Callable[[Dict], str], token_budget: int = CONTEXT_TOKEN_BUDGET,
+                 mmr_lambda: float = MMR_LAMBDA) -> Tuple[List[Dict], Dict[str, int]]:
+    """
+    Select up to top_k diverse candidates and pack them into token_budget tokens.
+
+    Candidates are taken in MMR order; one that would overflow the budget is skipped in
+    favour of later, shorter ones. The first pick is always kept (truncation of a single
+    oversized chunk is left to the model's context window).
+
+    Args:
+        candidates (List[Dict]): Over-fetched retrieval results, best first.
+        query_vector (Sequence[float]): Query embedding.
+        top_k (int): Maximum number of context items.
+        format_item (Callable[[Dict], str]): Renders an item as it appears in the prompt.
+        token_budget (int): Maximum total tokens of the rendered items.
+        mmr_lambda (float): Relevance weight for MMR.
+
+    Returns:
+        Tuple[List[Dict], Dict[str, int]]: The packed items (without "values") and a report
+        with candidates, selected, baseline_tokens (the first top_k candidates as retrieved),
+        packed_tokens and tokens_saved.
+    """
+    tokens = [count_tokens(format_item(c)) for c in candidates]
+    # Rank every candidate, so picks skipped for the budget can be replaced by later ones
+    picks = mmr_select(candidates, query_vector, len(candidates), mmr_lambda)
+
+    packed, used = [], 0
+    for i in picks:
+        if len(packed) >= top_k:
+            break
+        if packed and used + tokens[i] > token_budget:
+            continue
+        packed.append(i)
+        used += tokens[i]
+
+    baseline = sum(tokens[:top_k])
+    report = {
+        "candidates": len(candidates),
+        "selected": len(packed),
+        "baseline_tokens": baseline,
+        "packed_tokens": used,
+        "tokens_saved": baseline - used,
+    }
+    _log.info("Packed %d of %d candidates into %d context tokens (%d saved)",
+              len(packed), len(candidates), used, baseline - used)
+    context = [{key: value for key, value in candidates[i].items() if key != "values"} for i in packed]
+    return context, report
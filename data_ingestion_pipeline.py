@@ -1,8 +1,13 @@
 from airflow import DAG
-from airflow.operators.python import PythonOperator
+from airflow.decorators import task, task_group
 from datetime import datetime, timedelta
-import subprocess
-import os
+
+# Airflow pools bounding parallelism across documents; create them once with e.g.
+#   airflow pools set docling_conversion 4 "Docling PDF conversion"
+#   airflow pools set pinecone_embedding 8 "OpenAI embedding + Pinecone upsert"
+CONVERSION_POOL = 'docling_conversion'
+EMBEDDING_POOL = 'pinecone_embedding'
+DOCUMENT_CONVERSION_WORKERS = 4  # Processes used for page-range shards of one large PDF
 
 # Set default arguments
 default_args = {
@@ -14,13 +19,6 @@ default_args = {
     'retry_delay': timedelta(minutes=5),
 }
 
-# Function to run a Python script
-def run_script(script_path):
-    try:
-        subprocess.run(['python', script_path], check=True)
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError(f"Script {script_path} failed with error: {e}")
-
 # Define the DAG
 with DAG(
     'data_ingestion_pipeline',
@@ -31,19 +29,48 @@ with DAG(
     catchup=False,
 ) as dag:
 
-    # Task 1: Run the docling_to_s3.py script to parse data from S3
-    parse_data_from_s3 = PythonOperator(
-        task_id='parse_data_from_s3',
-        python_callable=run_script,
-        op_args=['/Users/shubhamagarwal/Documents/Northeastern/Semester_3/project_4/team9_project2/Data_Ingestion/docling_to_s3.py'],
-    )
+    # The ingestion modules are imported inside the tasks so parsing the DAG file stays
+    # cheap and does not load Docling's models in the scheduler.
+
+    # Task 1: Find source PDFs that are new, changed, or not fully upserted yet
+    @task
+    def find_documents_to_ingest():
+        import docling_to_s3
+        return docling_to_s3.list_documents_to_ingest()
+
+    # Tasks 2-3: One mapped group per document, so a document can be embedding while
+    # another is still converting and a failure only retries that document
+    @task_group(group_id='ingest_document')
+    def ingest_document(document):
+
+        @task(pool=CONVERSION_POOL)
+        def parse_document(document):
+            import docling_to_s3
+            if document['needs_conversion']:
+                docling_to_s3.convert_source_document(
+                    document['source_key'], document['etag'], max_workers=DOCUMENT_CONVERSION_WORKERS
+                )
+            return document['source_key']
+
+        @task(pool=EMBEDDING_POOL)
+        def send_document_to_pinecone(source_key):
+            import s3_pinecone
+            return s3_pinecone.ingest_source_document(source_key)
+
+        return send_document_to_pinecone(parse_document(document))
+
+    # Task 4: Remove vectors of documents whose source PDF was deleted
+    @task(trigger_rule='all_done')
+    def remove_deleted_documents():
+        import s3_pinecone
+        s3_pinecone.prune_deleted_sources()
 
-    # Task 2: Run the s3_pinecone.py script to send parsed data to Pinecone
-    send_data_to_pinecone = PythonOperator(
-        task_id='send_data_to_pinecone',
-        python_callable=run_script,
-        op_args=['/Users/shubhamagarwal/Documents/Northeastern/Semester_3/project_4/team9_project2/Data_Ingestion/s3_pinecone.py'],
-    )
+    # Task 5: Rebuild the document catalog read by DocumentSelectionAgent
+    @task(trigger_rule='all_done')
+    def update_document_catalog():
+        import s3_pinecone
+        s3_pinecone.update_document_catalog()
 
     # Define task dependencies
-    parse_data_from_s3 >> send_data_to_pinecone
+    ingested = ingest_document.expand(document=find_documents_to_ingest())
+    ingested >> remove_deleted_documents() >> update_document_catalog()
@@ -1,14 +1,20 @@
 import datetime
 import logging
+import os
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 import json
-import boto3
+import pypdfium2
+import s3_io
+from ingestion_manifest import DONE, IngestionManifest
 from docling.datamodel.base_models import InputFormat
 from docling.datamodel.pipeline_options import PdfPipelineOptions
 from docling.document_converter import DocumentConverter, PdfFormatOption
 from docling.utils.export import generate_multimodal_pages
 from docling.utils.utils import create_hash
+from page_artifacts import write_page_artifact
+from page_image_store import PageImageStore, encode_page_image
 
 # Configuration
 S3_BUCKET_NAME = 'team9-project4'  
@@ -17,42 +23,127 @@ S3_OUTPUT_FOLDER = 'output_json/'
 TEMP_DOWNLOAD_DIR = Path("/Users/shubhamagarwal/Documents/Northeastern/Semester_3/project_4/POC/temp_local")  # Temporary local directory
 
 # Initialize S3 Client
-s3_client = boto3.client('s3')
+s3_client = s3_io.get_s3_client()
 
 # Logging configuration
 _log = logging.getLogger(__name__)
 IMAGE_RESOLUTION_SCALE = 2.0
+WORKER_MEMORY_BYTES = 3 * 1024 ** 3  # Approximate peak memory of one worker with Docling's models loaded
+MAX_CONVERSION_WORKERS = 4
+
+def default_conversion_workers():
+    """Worker processes that fit in physical memory, capped by the CPU count and MAX_CONVERSION_WORKERS."""
+    workers = min(os.cpu_count() or 1, MAX_CONVERSION_WORKERS)
+    try:
+        memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):  # No sysconf (Windows)
+        return workers
+    return max(1, min(workers, memory // WORKER_MEMORY_BYTES))
+
+def threads_per_worker(workers):
+    """Docling inference threads per worker, so that the workers together use about one thread per core."""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+CONVERSION_WORKERS = default_conversion_workers()  # Worker processes used for PDF conversion
+SHARD_PAGE_THRESHOLD = 200  # PDFs with more pages than this are converted in page-range shards
+PAGES_PER_SHARD = 50
+ARTIFACT_FORMAT = "parquet"  # "parquet" (columnar) or "json" (legacy)
+STORE_PAGE_IMAGES = True  # Store page images as content-addressed S3 objects and keep only a reference
+
+# DocumentConverter and image store owned by the current process; built once and reused across files
+_worker_converter = None
+_worker_image_store = None
 
 def list_pdfs_from_s3(bucket_name, prefix):
-    """List PDF files in the specified S3 folder."""
-    response = s3_client.list_objects_v2(Bucket=bucket_name, Prefix=prefix)
-    pdf_files = [obj['Key'] for obj in response.get('Contents', []) if obj['Key'].endswith('.pdf')]
-    return pdf_files
+    """List all PDF files in the specified S3 folder, across every listing page."""
+    return s3_io.list_keys(bucket_name, prefix, suffixes=('.pdf',), s3_client=s3_client)
 
 def download_pdf_from_s3(bucket_name, s3_key, download_path):
     """Download a PDF file from S3 to the local path."""
-    download_path.parent.mkdir(parents=True, exist_ok=True)
-    s3_client.download_file(bucket_name, s3_key, str(download_path))
-    _log.info(f"Downloaded {s3_key} to {download_path}")
+    s3_io.download_files(bucket_name, {s3_key: download_path}, s3_client=s3_client)
 
 def upload_file_to_s3(local_path, bucket_name, s3_key):
     """Upload a file from the local path to S3."""
-    s3_client.upload_file(str(local_path), bucket_name, s3_key)
-    _log.info(f"Uploaded {local_path} to s3://{bucket_name}/{s3_key}")
+    s3_io.upload_files(bucket_name, {local_path: s3_key}, s3_client=s3_client)
 
-def process_pdf_to_json(input_doc_path, output_dir):
-    """Process a single PDF and save output to JSON."""
+def build_document_converter(num_threads=None):
+    """
+    Create a DocumentConverter configured for page image generation.
+
+    num_threads bounds Docling's inference threads; it defaults to the share of the cores
+    of one of CONVERSION_WORKERS concurrent converters.
+    """
     pipeline_options = PdfPipelineOptions()
     pipeline_options.images_scale = IMAGE_RESOLUTION_SCALE
     pipeline_options.generate_page_images = True
+    pipeline_options.accelerator_options.num_threads = num_threads or threads_per_worker(CONVERSION_WORKERS)
 
-    doc_converter = DocumentConverter(
+    return DocumentConverter(
         format_options={
             InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
         }
     )
 
-    conv_res = doc_converter.convert(input_doc_path)
+def get_document_converter(num_threads=None):
+    """Return this process's DocumentConverter, building it on first use."""
+    global _worker_converter
+    if _worker_converter is None:
+        _worker_converter = build_document_converter(num_threads)
+    return _worker_converter
+
+def get_page_image_store():
+    """Return this process's PageImageStore, or None if page images are kept inline."""
+    global _worker_image_store
+    if STORE_PAGE_IMAGES and _worker_image_store is None:
+        _worker_image_store = PageImageStore(S3_BUCKET_NAME)
+    return _worker_image_store
+
+def build_page_image(page, page_hash, image_store=None):
+    """Describe a page image, storing it in the image store when one is given."""
+    image = {
+        "width": page.image.width,
+        "height": page.image.height,
+    }
+    if image_store is not None:
+        image["format"] = image_store.image_format
+        image["ref"] = image_store.put(page_hash, page.image)
+    else:
+        image["format"] = "PNG"
+        image["bytes"] = encode_page_image(page.image, "PNG")
+    return image
+
+def count_pdf_pages(input_doc_path):
+    """Return the number of pages in a PDF without converting it."""
+    pdf = pypdfium2.PdfDocument(str(input_doc_path))
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+def plan_page_ranges(page_count, pages_per_shard=PAGES_PER_SHARD):
+    """Split 1..page_count into inclusive (start, end) page ranges."""
+    return [
+        (start, min(start + pages_per_shard - 1, page_count))
+        for start in range(1, page_count + 1, pages_per_shard)
+    ]
+
+def convert_pdf_to_rows(input_doc_path, doc_converter=None, page_range=None, image_store=None):
+    """
+    Convert a PDF (or an inclusive 1-based page range of it) into page rows.
+
+    Shards are converted from the full source file, so the document hash, page_num
+    and page_hash of each row match a single-pass conversion. Page images are written
+    to the image store and rows only carry their reference.
+    """
+    if doc_converter is None:
+        doc_converter = get_document_converter()
+    if image_store is None:
+        image_store = get_page_image_store()
+
+    if page_range is None:
+        conv_res = doc_converter.convert(input_doc_path)
+    else:
+        conv_res = doc_converter.convert(input_doc_path, page_range=page_range)
 
     rows = []
     for (
@@ -64,19 +155,14 @@ def process_pdf_to_json(input_doc_path, output_dir):
         page,
     ) in generate_multimodal_pages(conv_res):
         dpi = page._default_image_scale * 72
+        page_hash = create_hash(conv_res.input.document_hash + ":" + str(page.page_no - 1))
 
         rows.append(
             {
                 "document": conv_res.input.file.name,
                 "hash": conv_res.input.document_hash,
-                "page_hash": create_hash(
-                    conv_res.input.document_hash + ":" + str(page.page_no - 1)
-                ),
-                "image": {
-                    "width": page.image.width,
-                    "height": page.image.height,
-                    "base64": page.image.tobytes().hex(),
-                },
+                "page_hash": page_hash,
+                "image": build_page_image(page, page_hash, image_store),
                 "cells": page_cells,
                 "contents": content_text,
                 "contents_md": content_md,
@@ -91,44 +177,268 @@ def process_pdf_to_json(input_doc_path, output_dir):
             }
         )
 
-    # Use the input file name (without extension) as the output file name
-    output_filename = output_dir / f"{input_doc_path.stem}.json"
+    return rows
+
+def merge_shard_rows(shard_rows):
+    """Merge rows from page-range shards back into page order."""
+    merged = {}
+    for rows in shard_rows:
+        for row in rows:
+            merged[row["extra"]["page_num"]] = row
+    return [merged[page_num] for page_num in sorted(merged)]
+
+def _json_default(value):
+    """Serialize inline image bytes as a hex string."""
+    if isinstance(value, bytes):
+        return value.hex()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def write_rows_to_json(rows, output_dir, stem):
+    """Write page rows to <output_dir>/<stem>.json."""
+    for row in rows:
+        image = row.get("image") or {}
+        if "bytes" in image:
+            # Inline images are PNG files (image["format"]), written as a hex string. The old
+            # "base64" key held raw RGB pixels, so a new key keeps old consumers from misreading it
+            image["png_hex"] = image.pop("bytes")
+    output_filename = output_dir / f"{stem}.json"
     with open(output_filename, "w") as json_file:
-        json.dump(rows, json_file, indent=4)
+        json.dump(rows, json_file, indent=4, default=_json_default)
+    return output_filename
+
+def write_rows_to_artifact(rows, output_dir, stem, artifact_format=ARTIFACT_FORMAT):
+    """Write page rows to <output_dir>/<stem>.<format> in the configured artifact format."""
+    if artifact_format == "json":
+        return write_rows_to_json(rows, output_dir, stem)
+    output_filename = output_dir / f"{stem}.parquet"
+    return write_page_artifact(rows, output_filename)
+
+def process_pdf_to_artifact(input_doc_path, output_dir, doc_converter=None, artifact_format=ARTIFACT_FORMAT):
+    """Process a single PDF and save output as a page artifact."""
+    rows = convert_pdf_to_rows(input_doc_path, doc_converter)
+
+    # Use the input file name (without extension) as the output file name
+    output_filename = write_rows_to_artifact(rows, output_dir, input_doc_path.stem, artifact_format)
 
     _log.info(f"Processed {input_doc_path} and saved to {output_filename}")
 
     return output_filename
 
-def main():
+def process_pdf_to_json(input_doc_path, output_dir, doc_converter=None):
+    """Process a single PDF and save output to JSON."""
+    return process_pdf_to_artifact(input_doc_path, output_dir, doc_converter, artifact_format="json")
+
+def _init_conversion_worker(num_threads):
+    """Process pool initializer: load the layout models and S3 client once per worker."""
     logging.basicConfig(level=logging.INFO)
+    get_document_converter(num_threads)
+    get_page_image_store()
+
+def _convert_in_worker(input_doc_path, output_dir):
+    """Convert one PDF inside a worker, returning the error instead of raising it."""
+    try:
+        return process_pdf_to_artifact(input_doc_path, output_dir), None
+    except Exception as e:
+        _log.exception(f"Failed to convert {input_doc_path}")
+        return None, f"{type(e).__name__}: {e}"
+
+def _convert_shard_in_worker(input_doc_path, page_range):
+    """Convert one page range of a PDF inside a worker, returning its rows or the error."""
+    try:
+        return convert_pdf_to_rows(input_doc_path, page_range=page_range), None
+    except Exception as e:
+        _log.exception(f"Failed to convert pages {page_range} of {input_doc_path}")
+        return None, f"{type(e).__name__}: {e}"
+
+def convert_pdfs_parallel(
+    pdf_paths,
+    output_dir,
+    max_workers=CONVERSION_WORKERS,
+    shard_page_threshold=SHARD_PAGE_THRESHOLD,
+    pages_per_shard=PAGES_PER_SHARD,
+    on_converted=None,
+):
+    """
+    Convert PDFs to page artifacts in a process pool where each worker reuses one DocumentConverter.
+
+    PDFs with more than shard_page_threshold pages are split into page ranges that are
+    converted as separate tasks in the same pool and merged back in page order. A failure
+    on one file is logged and reported without stopping the rest of the batch.
+    on_converted(pdf_path, output_path), if given, is called as soon as each document's
+    artifact is written, so callers can checkpoint while the rest of the batch runs.
+
+    Returns:
+        Tuple of ({pdf_path: output_artifact_path} for successes, {pdf_path: error} for failures).
+    """
+    converted, failed = {}, {}
+    if not pdf_paths:
+        return converted, failed
+
+    # Plan the work: whole files for small PDFs, page ranges for large ones
+    shard_plans = {}
+    for pdf_path in pdf_paths:
+        try:
+            page_count = count_pdf_pages(pdf_path)
+        except Exception as e:
+            failed[pdf_path] = f"{type(e).__name__}: {e}"
+            continue
+        if shard_page_threshold and page_count > shard_page_threshold:
+            shard_plans[pdf_path] = plan_page_ranges(page_count, pages_per_shard)
+    task_count = len(pdf_paths) - len(failed) - len(shard_plans) + sum(len(r) for r in shard_plans.values())
+    if task_count == 0:
+        return converted, failed
+
+    shard_results = {pdf_path: [] for pdf_path in shard_plans}
+    max_workers = max(1, min(max_workers, task_count))
+    # Split the cores between the workers instead of letting each start Docling's default thread count
+    with ProcessPoolExecutor(
+        max_workers=max_workers, initializer=_init_conversion_worker, initargs=(threads_per_worker(max_workers),)
+    ) as executor:
+        futures = {}
+        for pdf_path in pdf_paths:
+            if pdf_path in failed:
+                continue
+            if pdf_path in shard_plans:
+                _log.info(f"Converting {pdf_path} in {len(shard_plans[pdf_path])} page-range shards")
+                for page_range in shard_plans[pdf_path]:
+                    futures[executor.submit(_convert_shard_in_worker, pdf_path, page_range)] = pdf_path
+            else:
+                futures[executor.submit(_convert_in_worker, pdf_path, output_dir)] = pdf_path
+
+        for future in as_completed(futures):
+            pdf_path = futures[future]
+            try:
+                result, error = future.result()
+            except Exception as e:  # The worker process itself died
+                result, error = None, f"{type(e).__name__}: {e}"
+            if error:
+                failed.setdefault(pdf_path, error)
+                continue
+            if pdf_path in shard_plans:
+                shard_results[pdf_path].append(result)
+                if len(shard_results[pdf_path]) < len(shard_plans[pdf_path]) or pdf_path in failed:
+                    continue
+                rows = merge_shard_rows(shard_results.pop(pdf_path))
+                result = write_rows_to_artifact(rows, output_dir, pdf_path.stem)
+                _log.info(f"Processed {pdf_path} in {len(shard_plans[pdf_path])} shards and saved to {result}")
+            converted[pdf_path] = result
+            if on_converted is not None:
+                on_converted(pdf_path, result)
+
+    return converted, failed
+
+def list_documents_to_ingest():
+    """
+    List source PDFs that still need conversion or upsert, for per-document DAG tasks.
+
+    Returns:
+        list: {"source_key", "etag", "needs_conversion"} dicts.
+    """
+    manifest = IngestionManifest(S3_BUCKET_NAME, s3_client=s3_client)
+    records = {record["source_key"]: record for record in manifest.records()}
+    documents = []
+    for item in s3_io.iter_objects(S3_BUCKET_NAME, S3_INPUT_FOLDER, suffixes=('.pdf',), s3_client=s3_client):
+        record = records.get(item['Key'])
+        converted = record is not None and record["etag"] == item['ETag'] and record["conversion_status"] == DONE
+        if converted and record["upsert_status"] == DONE:
+            continue
+        documents.append({"source_key": item['Key'], "etag": item['ETag'], "needs_conversion": not converted})
+    return documents
 
-    # List all PDF files in the S3 input folder
-    pdf_files = list_pdfs_from_s3(S3_BUCKET_NAME, S3_INPUT_FOLDER)
+def convert_source_document(source_key, etag, max_workers=CONVERSION_WORKERS):
+    """
+    Download, convert and upload a single source PDF, and record it in the manifest.
+
+    Small PDFs are converted in this process with its cached DocumentConverter; PDFs
+    above SHARD_PAGE_THRESHOLD pages are split into page-range shards across a process pool.
+    A failure is recorded in the manifest and re-raised so the caller can retry.
+
+    Returns:
+        str: S3 key of the uploaded page artifact.
+    """
+    manifest = IngestionManifest(S3_BUCKET_NAME, s3_client=s3_client)
+    work_dir = TEMP_DOWNLOAD_DIR / Path(source_key).stem
+    output_dir = work_dir / "output"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    local_pdf_path = work_dir / Path(source_key).name
+
+    try:
+        download_pdf_from_s3(S3_BUCKET_NAME, source_key, local_pdf_path)
+        if count_pdf_pages(local_pdf_path) > SHARD_PAGE_THRESHOLD:
+            converted, failed = convert_pdfs_parallel([local_pdf_path], output_dir, max_workers=max_workers)
+            if failed:
+                raise RuntimeError(failed[local_pdf_path])
+            output_path = converted[local_pdf_path]
+        else:
+            output_path = process_pdf_to_artifact(local_pdf_path, output_dir)
+
+        output_s3_key = f"{S3_OUTPUT_FOLDER}{output_path.name}"
+        upload_file_to_s3(output_path, S3_BUCKET_NAME, output_s3_key)
+        output_path.unlink()  # Delete the local artifact
+    except Exception as e:
+        manifest.mark_conversion_failed(source_key, etag, f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        local_pdf_path.unlink(missing_ok=True)  # Delete the local PDF file
+
+    manifest.mark_converted(source_key, etag, output_s3_key)
+    return output_s3_key
+
+def main(max_workers=CONVERSION_WORKERS):
+    logging.basicConfig(level=logging.INFO)
+
+    manifest = IngestionManifest(S3_BUCKET_NAME, s3_client=s3_client)
+
+    # List all PDF files in the S3 input folder and skip versions that were already converted
+    sources = {
+        item['Key']: item['ETag']
+        for item in s3_io.iter_objects(S3_BUCKET_NAME, S3_INPUT_FOLDER, suffixes=('.pdf',), s3_client=s3_client)
+    }
+    records = {record["source_key"]: record for record in manifest.records()}
+    pdf_files = [
+        s3_key for s3_key, etag in sources.items()
+        if not (s3_key in records and records[s3_key]["etag"] == etag and records[s3_key]["conversion_status"] == DONE)
+    ]
+    _log.info(f"{len(pdf_files)} of {len(sources)} PDFs are new or changed.")
+    if not pdf_files:
+        return
 
     # Temporary directory for processing files locally
     TEMP_DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
-    for s3_key in pdf_files:
-        local_pdf_path = TEMP_DOWNLOAD_DIR / Path(s3_key).name
-        download_pdf_from_s3(S3_BUCKET_NAME, s3_key, local_pdf_path)
+    # Define output directory in the temp location
+    output_dir = TEMP_DOWNLOAD_DIR / "output"
+    output_dir.mkdir(parents=True, exist_ok=True)
 
-        # Define output directory in the temp location
-        output_dir = TEMP_DOWNLOAD_DIR / "output"
-        output_dir.mkdir(parents=True, exist_ok=True)
+    # Download the PDFs concurrently; Docling workers read them from local disk
+    downloads = {s3_key: TEMP_DOWNLOAD_DIR / Path(s3_key).name for s3_key in pdf_files}
+    s3_io.download_files(S3_BUCKET_NAME, downloads, s3_client=s3_client)
+    source_keys = {local_pdf_path: s3_key for s3_key, local_pdf_path in downloads.items()}
 
-        # Process the PDF and generate output JSON file
-        output_json_path = process_pdf_to_json(local_pdf_path, output_dir)
+    def checkpoint(local_pdf_path, output_path):
+        # Upload each artifact and record it as soon as it is ready, so a crash
+        # later in the batch does not lose the documents already converted
+        output_s3_key = f"{S3_OUTPUT_FOLDER}{output_path.name}"
+        upload_file_to_s3(output_path, S3_BUCKET_NAME, output_s3_key)
+        output_path.unlink()  # Delete the local artifact
+        s3_key = source_keys[local_pdf_path]
+        manifest.mark_converted(s3_key, sources[s3_key], output_s3_key)
 
-        # Upload the JSON file to S3 output folder
-        output_s3_key = f"{S3_OUTPUT_FOLDER}{output_json_path.name}"
-        upload_file_to_s3(output_json_path, S3_BUCKET_NAME, output_s3_key)
+    # Process the PDFs and generate output artifacts in parallel
+    converted, failed = convert_pdfs_parallel(
+        list(source_keys), output_dir, max_workers=max_workers, on_converted=checkpoint
+    )
 
-        # Clean up local files if necessary (optional)
+    # Clean up local files if necessary (optional)
+    for local_pdf_path in source_keys:
         local_pdf_path.unlink()  # Delete the local PDF file
-        output_json_path.unlink()  # Delete the local JSON file
 
-    _log.info("All PDFs processed and uploaded to S3.")
+    for local_pdf_path, error in failed.items():
+        _log.error(f"Conversion failed for {local_pdf_path.name}: {error}")
+        s3_key = source_keys[local_pdf_path]
+        manifest.mark_conversion_failed(s3_key, sources[s3_key], error)
+
+    _log.info(f"{len(converted)} PDFs processed and uploaded to S3, {len(failed)} failed.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,93 @@
+import datetime
+import json
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from botocore.exceptions import ClientError
+
+import s3_io
+
+# Configuration
+S3_BUCKET_NAME = 'team9-project4'
+S3_CATALOG_KEY = 'catalog/documents.json'
+CATALOG_CACHE_TTL = 60  # Seconds a loaded catalog is served from memory
+
+_log = logging.getLogger(__name__)
+
+
+def catalog_entry_from_record(record: dict) -> dict:
+    """Build a catalog entry from a fully upserted ingestion manifest record."""
+    return {
+        "title": record["document_name"],
+        "source_key": record["source_key"],
+        "page_count": record.get("page_count", 0),
+        "vector_count": len(record.get("vector_ids", [])),
+        "ingested_at": record.get("ingested_at"),
+    }
+
+
+class DocumentCatalog:
+    """
+    Catalog of ingested documents (title, page count, ingest timestamp) kept as one
+    small JSON object in S3.
+
+    The catalog is rebuilt at ingest time from the ingestion manifest, so listing
+    documents costs a single GET instead of a scan over every vector in the index.
+    """
+
+    def __init__(self, bucket_name: str = S3_BUCKET_NAME, key: str = S3_CATALOG_KEY,
+                 s3_client=None, ttl: float = CATALOG_CACHE_TTL):
+        self.bucket_name = bucket_name
+        self.key = key
+        self.s3_client = s3_client or s3_io.get_s3_client()
+        self.ttl = ttl
+        self._entries = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def load(self, refresh: bool = False) -> Optional[Dict[str, dict]]:
+        """
+        Return catalog entries keyed by title, served from memory for up to ttl seconds.
+
+        Returns:
+            Optional[Dict[str, dict]]: The entries, or None if no catalog has been written yet.
+        """
+        with self._lock:
+            if not refresh and self._entries is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return self._entries
+            try:
+                body = s3_io.open_object_stream(self.bucket_name, self.key, s3_client=self.s3_client)
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                    return None
+                raise
+            data = json.load(body)
+            self._entries = {entry["title"]: entry for entry in data.get("documents", [])}
+            self._loaded_at = time.monotonic()
+            return self._entries
+
+    def titles(self) -> Optional[List[str]]:
+        """Return sorted document titles, or None if no catalog has been written yet."""
+        entries = self.load()
+        return None if entries is None else sorted(entries)
+
+    def save(self, entries: Iterable[dict]):
+        """Replace the catalog with the given entries."""
+        entries = sorted(entries, key=lambda entry: entry["title"])
+        payload = {
+            "updated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "documents": entries,
+        }
+        s3_io.upload_bytes(
+            self.bucket_name,
+            self.key,
+            json.dumps(payload).encode("utf-8"),
+            s3_client=self.s3_client,
+            ContentType="application/json",
+        )
+        with self._lock:
+            self._entries = {entry["title"]: entry for entry in entries}
+            self._loaded_at = time.monotonic()
+        _log.info(f"Saved document catalog with {len(entries)} documents to s3://{self.bucket_name}/{self.key}")
@@ -3,27 +3,69 @@
 This ensures the system knows the exact document the user wants to work with."""
 
 import pinecone
-from typing import List
+from typing import Dict, List
+from document_catalog import DocumentCatalog
+from local_vector_index import VECTOR_BACKEND, open_local_index
 
 # Pinecone Configuration
 PINECONE_API_KEY = ""
 INDEX_NAME = "team9-project4-vector"
 
-# Initialize Pinecone
-pc = pinecone.Pinecone(api_key=PINECONE_API_KEY)
+if VECTOR_BACKEND == "local":
+    # Use the on-disk local index instead of Pinecone
+    index = open_local_index(INDEX_NAME)
+else:
+    # Initialize Pinecone
+    pc = pinecone.Pinecone(api_key=PINECONE_API_KEY)
 
-# Access the existing index
-index = pc.Index(INDEX_NAME)
+    # Access the existing index
+    index = pc.Index(INDEX_NAME)
 
 
 class DocumentSelectionAgent:
-    def __init__(self, pinecone_index):
+    def __init__(self, pinecone_index, catalog: DocumentCatalog = None):
         self.index = pinecone_index
+        self.catalog = catalog or DocumentCatalog()
 
     def fetch_documents(self) -> List[str]:
         """
-        Fetch all available document titles from Pinecone.
+        Fetch all available document titles from the document catalog.
+
+        Falls back to scanning the Pinecone index if no catalog has been written yet.
         
+        Returns:
+            List[str]: A list of unique document titles.
+        """
+        try:
+            titles = self.catalog.titles()
+            if titles is not None:
+                return titles
+            print("Document catalog not found; scanning the index instead.")
+        except Exception as e:
+            print(f"Error reading document catalog: {e}")
+        return self._scan_index_titles()
+
+    def fetch_document_details(self) -> List[Dict]:
+        """
+        Fetch catalog entries (title, page count, ingest timestamp) for all documents.
+
+        Returns:
+            List[Dict]: Catalog entries sorted by title, or an empty list if unavailable.
+        """
+        try:
+            entries = self.catalog.load() or {}
+            return [entries[title] for title in sorted(entries)]
+        except Exception as e:
+            print(f"Error reading document catalog: {e}")
+            return []
+
+    def _scan_index_titles(self) -> List[str]:
+        """
+        Collect document titles by querying every vector's metadata in Pinecone.
+
+        This is slow on large indexes and capped by the query top_k limit; it is only
+        used until the ingestion pipeline has written the document catalog.
+
         Returns:
             List[str]: A list of unique document titles.
         """
@@ -0,0 +1,191 @@
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+# Configuration
+DEFAULT_CACHE_PATH = Path("./embedding_cache.sqlite3")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # Evict least recently used entries above this size
+
+_log = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Persistent SQLite cache of embeddings keyed by content hash and embedding model.
+
+    Separately, the cache records which content hash each vector id of an index was
+    last upserted with, so unchanged vectors can skip both the embedding request and the
+    upsert. Embeddings are shared by every vector with the same content; the upsert
+    record is per vector id, so identical content under a new id is still written.
+    """
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                content_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (content_hash, model)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_access ON embeddings (last_access)")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS upserted_vectors (
+                index_name TEXT NOT NULL,
+                vector_id TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                PRIMARY KEY (index_name, vector_id)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get_many(self, content_hashes: Iterable[str], model: str) -> Dict[str, dict]:
+        """
+        Look up cached embeddings for several content hashes.
+
+        Args:
+            content_hashes (Iterable[str]): Content hashes to look up.
+            model (str): Embedding model name.
+
+        Returns:
+            Dict[str, dict]: Maps each cached hash to {"embedding": [...]}.
+        """
+        content_hashes = list(dict.fromkeys(content_hashes))
+        if not content_hashes:
+            return {}
+
+        found = {}
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement
+            for start in range(0, len(content_hashes), 500):
+                chunk = content_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT content_hash, embedding FROM embeddings "
+                    f"WHERE model = ? AND content_hash IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchall()
+                for content_hash, blob in rows:
+                    found[content_hash] = {"embedding": array("f", blob).tolist()}
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE content_hash = ? AND model = ?",
+                    [(now, content_hash, model) for content_hash in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, embeddings: Dict[str, List[float]], model: str):
+        """
+        Store embeddings for several content hashes and evict old entries if over budget.
+
+        Args:
+            embeddings (Dict[str, List[float]]): Maps content hash to embedding vector.
+            model (str): Embedding model name.
+        """
+        if not embeddings:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (content_hash, model, embedding, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (content_hash, model, array("f", embedding).tobytes(), now)
+                    for content_hash, embedding in embeddings.items()
+                ],
+            )
+            self._conn.commit()
+            self._evict()
+
+    def upserted_hashes(self, vector_ids: Iterable[str], model: str, index_name: str) -> Dict[str, str]:
+        """
+        Look up the content hash each vector id was last upserted with.
+
+        Args:
+            vector_ids (Iterable[str]): Vector ids to look up.
+            model (str): Embedding model name; upserts made with another model are ignored.
+            index_name (str): Name of the index.
+
+        Returns:
+            Dict[str, str]: Maps each recorded vector id to its content hash.
+        """
+        vector_ids = list(dict.fromkeys(vector_ids))
+        found = {}
+        with self._lock:
+            for start in range(0, len(vector_ids), 500):
+                chunk = vector_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT vector_id, content_hash FROM upserted_vectors "
+                    f"WHERE index_name = ? AND model = ? AND vector_id IN ({placeholders})",
+                    [index_name, model, *chunk],
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def mark_upserted(self, vectors: Dict[str, str], model: str, index_name: str):
+        """Record that these vector ids now hold the embeddings of the given content hashes."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO upserted_vectors (index_name, vector_id, content_hash, model) "
+                "VALUES (?, ?, ?, ?)",
+                [(index_name, vector_id, content_hash, model) for vector_id, content_hash in vectors.items()],
+            )
+            self._conn.commit()
+
+    def forget_upserted(self, vector_ids: Iterable[str], index_name: str):
+        """Record that these vector ids were deleted from the index."""
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM upserted_vectors WHERE index_name = ? AND vector_id = ?",
+                [(index_name, vector_id) for vector_id in vector_ids],
+            )
+            self._conn.commit()
+
+    def size_bytes(self) -> int:
+        """Return the total size of the stored embeddings in bytes."""
+        row = self._conn.execute("SELECT COALESCE(SUM(LENGTH(embedding)), 0) FROM embeddings").fetchone()
+        return row[0]
+
+    def _evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        total = self.size_bytes()
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        rows = self._conn.execute(
+            "SELECT content_hash, model, LENGTH(embedding) FROM embeddings ORDER BY last_access ASC"
+        )
+        to_delete = []
+        for content_hash, model, size in rows:
+            if total <= self.max_bytes:
+                break
+            to_delete.append((content_hash, model))
+            total -= size
+            evicted += 1
+        self._conn.executemany("DELETE FROM embeddings WHERE content_hash = ? AND model = ?", to_delete)
+        self._conn.commit()
+        _log.info(f"Evicted {evicted} embeddings from {self.path}")
+
+    def close(self):
+        """Close the underlying SQLite connection."""
+        self._conn.close()
@@ -0,0 +1,149 @@
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from html_extraction import FetchedPage, fetch_page_text
+
+# Configuration
+FETCH_CACHE_PATH = Path("./fetch_cache.sqlite3")
+FETCH_CACHE_TTL = 24 * 60 * 60  # Seconds before a cached page is revalidated
+FETCH_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Evict least recently used pages above this size
+
+_log = logging.getLogger(__name__)
+
+
+class FetchCache:
+    """
+    Disk-backed cache of extracted page text keyed by URL.
+
+    Entries are served directly for ttl seconds, then revalidated with the stored
+    ETag/Last-Modified validators; least recently used entries are evicted once the
+    stored text exceeds max_bytes.
+    """
+
+    def __init__(self, path: Path = FETCH_CACHE_PATH, ttl: float = FETCH_CACHE_TTL,
+                 max_bytes: int = FETCH_CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_access ON pages (last_access)")
+        self._conn.commit()
+
+    def fetch_text(self, url: str, session=None, timeout: float = 10,
+                   fetcher: Optional[Callable[..., FetchedPage]] = None) -> str:
+        """
+        Return the extracted text of a page, from the cache when it is fresh or still valid.
+
+        Args:
+            url (str): URL of the page.
+            session: requests.Session (or the requests module) used for network fetches.
+            timeout (float): Request timeout in seconds.
+            fetcher (callable): Replaces fetch_page_text, with the same signature.
+
+        Returns:
+            str: Extracted page text.
+        """
+        fetcher = fetcher or fetch_page_text
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, etag, last_modified, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is not None and now - row[3] < self.ttl:
+                self.hits += 1
+                self._conn.execute("UPDATE pages SET last_access = ? WHERE url = ?", (now, url))
+                self._conn.commit()
+                return row[0]
+
+        headers = {}
+        if row is not None:
+            if row[1]:
+                headers["If-None-Match"] = row[1]
+            if row[2]:
+                headers["If-Modified-Since"] = row[2]
+
+        page = fetcher(url, headers, session=session, timeout=timeout)
+
+        with self._lock:
+            if page.status_code == 304 and row is not None:
+                self.revalidated += 1
+                self._conn.execute(
+                    "UPDATE pages SET fetched_at = ?, last_access = ? WHERE url = ?", (now, now, url)
+                )
+                self._conn.commit()
+                return row[0]
+
+            self.misses += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, text, etag, last_modified, fetched_at, last_access, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, page.text, page.etag, page.last_modified, now, now, len(page.text.encode("utf-8"))),
+            )
+            self._conn.commit()
+            self._evict()
+        return page.text
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and the current cache size."""
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        lookups = self.hits + self.misses + self.revalidated
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "hit_rate": (self.hits + self.revalidated) / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+    def _evict(self):
+        """Delete least recently used pages until the cache fits in max_bytes."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        to_delete = []
+        for url, size in self._conn.execute("SELECT url, size FROM pages ORDER BY last_access ASC"):
+            if total <= self.max_bytes:
+                break
+            to_delete.append((url,))
+            total -= size
+        self._conn.executemany("DELETE FROM pages WHERE url = ?", to_delete)
+        self._conn.commit()
+        _log.info(f"Evicted {len(to_delete)} pages from {self.path}")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_fetch_cache() -> FetchCache:
+    """Return the process-wide fetch cache shared by the web and arXiv agents."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = FetchCache()
+    return _default_cache
@@ -0,0 +1,131 @@
+import codecs
+import logging
+from collections import namedtuple
+from contextlib import closing
+from html.parser import HTMLParser
+from typing import Dict, Iterable
+
+import requests
+
+# Configuration
+MAX_RESPONSE_BYTES = 2 * 1024 * 1024  # Stop downloading a page after this many bytes
+MAX_TEXT_CHARS = 20000  # Stop extracting once this many characters of paragraph text are collected
+STREAM_CHUNK_SIZE = 64 * 1024
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+_log = logging.getLogger(__name__)
+
+# Result of fetching a page: extracted text plus the validators needed for revalidation
+FetchedPage = namedtuple("FetchedPage", ["status_code", "text", "etag", "last_modified"])
+
+
+class UnsupportedContentError(requests.RequestException):
+    """Raised when a response is not HTML (e.g. a PDF or an image)."""
+
+
+class ParagraphExtractor(HTMLParser):
+    """
+    Incremental parser that collects the text of <p> elements without building a tree.
+
+    Feed it decoded chunks as they arrive; `done` becomes True once max_chars characters
+    have been collected, so the caller can stop reading the response.
+    """
+
+    _SKIPPED_TAGS = {"script", "style", "noscript", "template"}
+
+    def __init__(self, max_chars: int = MAX_TEXT_CHARS):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.paragraphs = []
+        self.chars = 0
+        self.done = False
+        self._depth = 0  # Nesting depth of open <p> elements
+        self._skip_depth = 0
+        self._current = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag == "p":
+            self._depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "p" and self._depth:
+            self._depth -= 1
+            if not self._depth:
+                self._close_paragraph()
+
+    def handle_data(self, data):
+        if self._depth and not self._skip_depth and not self.done:
+            self._current.append(data)
+            self.chars += len(data)
+            if self.chars >= self.max_chars:
+                self._close_paragraph()
+                self.done = True
+
+    def _close_paragraph(self):
+        if self._current:
+            self.paragraphs.append("".join(self._current))
+            self._current = []
+
+    def text(self) -> str:
+        """Return the collected paragraphs joined by newlines, truncated to max_chars."""
+        self._close_paragraph()
+        return "\n".join(self.paragraphs)[:self.max_chars]
+
+
+def extract_paragraphs(chunks: Iterable[str], max_chars: int = MAX_TEXT_CHARS) -> str:
+    """Extract paragraph text from decoded HTML chunks, stopping at the character budget."""
+    parser = ParagraphExtractor(max_chars)
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.done:
+            break
+    return parser.text()
+
+
+def fetch_page_text(url: str, headers: Dict[str, str], session=None, timeout: float = 10,
+                    max_bytes: int = MAX_RESPONSE_BYTES, max_chars: int = MAX_TEXT_CHARS) -> FetchedPage:
+    """
+    Stream a page and extract its paragraph text within byte and character budgets.
+
+    Non-HTML responses are rejected from their headers before the body is read. A 304
+    Not Modified response is returned with empty text so a cache can reuse its copy.
+
+    Args:
+        url (str): URL of the page.
+        headers (Dict[str, str]): Extra request headers (e.g. conditional validators).
+        session: requests.Session (or the requests module) used for the request.
+        timeout (float): Request timeout in seconds.
+        max_bytes (int): Maximum number of body bytes read.
+        max_chars (int): Maximum number of characters extracted.
+
+    Returns:
+        FetchedPage: Status code, extracted text and the response validators.
+    """
+    http = session or requests
+    response = http.get(url, headers=headers, timeout=timeout, stream=True)
+    with closing(response):
+        etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        if response.status_code == 304:
+            return FetchedPage(304, "", etag, last_modified)
+        response.raise_for_status()
+
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type and content_type not in HTML_CONTENT_TYPES:
+            raise UnsupportedContentError(f"Unsupported content type {content_type!r}", response=response)
+
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        parser = ParagraphExtractor(max_chars)
+        bytes_read = 0
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            bytes_read += len(chunk)
+            parser.feed(decoder.decode(chunk))
+            if parser.done:
+                break
+            if bytes_read >= max_bytes:
+                _log.debug(f"Stopped reading {url} after {bytes_read} bytes")
+                break
+        return FetchedPage(response.status_code, parser.text(), etag, last_modified)
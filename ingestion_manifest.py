@@ -0,0 +1,119 @@
+import datetime
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, Optional
+
+from botocore.exceptions import ClientError
+
+import s3_io
+
+# Configuration
+S3_BUCKET_NAME = 'team9-project4'
+S3_MANIFEST_FOLDER = 'manifests/'
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+_log = logging.getLogger(__name__)
+
+
+def new_record(source_key: str, etag: str) -> dict:
+    """Create a manifest record for a source document that has not been processed yet."""
+    return {
+        "source_key": source_key,
+        "etag": etag,
+        "artifact_key": None,
+        "conversion_status": PENDING,
+        "upsert_status": PENDING,
+        "upserted_pages": 0,  # Checkpoint: pages of the artifact already upserted, in order
+        "vector_ids": [],
+        "stale_vector_ids": [],  # Vectors of a previous version still to be removed
+        "error": None,
+        "updated_at": None,
+    }
+
+
+class IngestionManifest:
+    """
+    Per-document ingestion state stored as one small JSON object per source PDF in S3.
+
+    Each record holds the source ETag, the conversion and upsert status, an upsert
+    checkpoint and the ids of the vectors written for the document. One object per
+    document lets parallel tasks update their own documents without contention.
+    """
+
+    def __init__(self, bucket_name: str = S3_BUCKET_NAME, prefix: str = S3_MANIFEST_FOLDER, s3_client=None):
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.s3_client = s3_client or s3_io.get_s3_client()
+
+    def key_for(self, source_key: str) -> str:
+        """Return the manifest key for a source document."""
+        return f"{self.prefix}{Path(source_key).stem}.json"
+
+    def get(self, source_key: str) -> Optional[dict]:
+        """Load the record for a source document, or None if it was never processed."""
+        try:
+            body = s3_io.open_object_stream(self.bucket_name, self.key_for(source_key), s3_client=self.s3_client)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return None
+            raise
+        return json.load(body)
+
+    def put(self, record: dict):
+        """Save a record, stamping its update time."""
+        record["updated_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        s3_io.upload_bytes(
+            self.bucket_name,
+            self.key_for(record["source_key"]),
+            json.dumps(record).encode("utf-8"),
+            s3_client=self.s3_client,
+            ContentType="application/json",
+        )
+
+    def delete(self, source_key: str):
+        """Remove the record for a source document."""
+        self.s3_client.delete_object(Bucket=self.bucket_name, Key=self.key_for(source_key))
+
+    def records(self, max_workers: int = 16) -> Iterator[dict]:
+        """Yield every record in the manifest."""
+        keys = s3_io.list_keys(self.bucket_name, self.prefix, suffixes=('.json',), s3_client=self.s3_client)
+
+        def load(key):
+            return json.load(s3_io.open_object_stream(self.bucket_name, key, s3_client=self.s3_client))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            yield from executor.map(load, keys)
+
+    def needs_conversion(self, source_key: str, etag: str) -> bool:
+        """Return True unless this exact version of the source was already converted."""
+        record = self.get(source_key)
+        return not (record and record["etag"] == etag and record["conversion_status"] == DONE)
+
+    def mark_converted(self, source_key: str, etag: str, artifact_key: str) -> dict:
+        """
+        Record a successful conversion and reset the upsert checkpoint.
+
+        Vectors written for a previous version of the document are carried over as
+        stale ids so the next upsert can delete any that the new version no longer has.
+        """
+        previous = self.get(source_key)
+        record = new_record(source_key, etag)
+        if previous:
+            record["stale_vector_ids"] = sorted(set(previous.get("stale_vector_ids", [])) | set(previous.get("vector_ids", [])))
+        record["artifact_key"] = artifact_key
+        record["conversion_status"] = DONE
+        self.put(record)
+        return record
+
+    def mark_conversion_failed(self, source_key: str, etag: str, error: str) -> dict:
+        """Record a failed conversion so the next run retries it."""
+        record = self.get(source_key) or new_record(source_key, etag)
+        record["conversion_status"] = FAILED
+        record["error"] = error
+        self.put(record)
+        return record
@@ -0,0 +1,212 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Configuration
+# Written by ingestion and read by the API: both must point at the same file
+KEYWORD_INDEX_PATH = Path(os.environ.get("KEYWORD_INDEX_PATH", "./keyword_index.sqlite3"))
+MAX_QUERY_TERMS = 32
+MAX_TERM_DOC_FRACTION = 0.2  # Query terms found on more pages than this are too common to search
+MIN_PRUNED_TERM_PAGES = 100  # ...unless they are on fewer pages than this (small corpora)
+
+_log = logging.getLogger(__name__)
+
+# Query terms keep joined tokens together; each is searched as a phrase, which FTS5's
+# unicode61 tokenizer splits into words, so "10-K" or "12.3" match as adjacent words
+_TOKEN_PATTERN = re.compile(r"[^\W_]+(?:[-./][^\W_]+)*")
+_WORD_PATTERN = re.compile(r"[^\W_]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how in is it its of on or "
+    "that the their this to was were what when where which who why will with".split()
+)
+
+
+def query_terms(text: str, max_terms: int = MAX_QUERY_TERMS) -> List[str]:
+    """Return the distinct non-stopword terms of `text`, lowercased and without diacritics."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text):
+        if token not in _STOPWORDS and token not in terms:
+            terms.append(token)
+    return terms[:max_terms]
+
+
+class KeywordIndex:
+    """
+    BM25 keyword index over page text, kept in SQLite FTS5.
+
+    Pages are keyed by their vector id, so the index is updated incrementally alongside
+    the vector index and its hits can be fused with vector search results.
+    """
+
+    def __init__(self, path: Path = KEYWORD_INDEX_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                rowid INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                document TEXT NOT NULL,
+                page_num INTEGER,
+                page_hash TEXT
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_document ON pages (document)")
+        # Unstemmed unicode61 tokens, so query words can be looked up in the vocabulary;
+        # rowids match the pages table
+        self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(body, tokenize='unicode61')")
+        self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS pages_vocab USING fts5vocab(pages_fts, 'row')")
+        self._conn.commit()
+        self._page_count = None
+        self._data_version = None
+
+    def add_pages(self, pages: Iterable[Tuple[str, str, int, str, str]]):
+        """
+        Insert or replace pages.
+
+        Args:
+            pages (Iterable[Tuple]): (vector id, document, page_num, page_hash, text) tuples.
+        """
+        with self._lock:
+            count = 0
+            for vector_id, document, page_num, page_hash, text in pages:
+                row = self._conn.execute("SELECT rowid FROM pages WHERE id = ?", (vector_id,)).fetchone()
+                if row is not None:
+                    self._conn.execute("DELETE FROM pages_fts WHERE rowid = ?", row)
+                    self._conn.execute(
+                        "UPDATE pages SET document = ?, page_num = ?, page_hash = ? WHERE rowid = ?",
+                        (document, page_num, page_hash, row[0]),
+                    )
+                    rowid = row[0]
+                else:
+                    rowid = self._conn.execute(
+                        "INSERT INTO pages (id, document, page_num, page_hash) VALUES (?, ?, ?, ?)",
+                        (vector_id, document, page_num, page_hash),
+                    ).lastrowid
+                self._conn.execute("INSERT INTO pages_fts (rowid, body) VALUES (?, ?)", (rowid, text or ""))
+                count += 1
+            self._conn.commit()
+            self._page_count = None
+        return count
+
+    def delete(self, vector_ids: Iterable[str]):
+        """Remove pages by vector id."""
+        with self._lock:
+            for vector_id in vector_ids:
+                row = self._conn.execute("SELECT rowid FROM pages WHERE id = ?", (vector_id,)).fetchone()
+                if row is not None:
+                    self._conn.execute("DELETE FROM pages_fts WHERE rowid = ?", row)
+                    self._conn.execute("DELETE FROM pages WHERE rowid = ?", row)
+            self._conn.commit()
+            self._page_count = None
+
+    def search(self, text: str, top_k: int = 10, documents: Sequence[str] = None) -> List[Dict]:
+        """
+        Return the top_k pages ranked by BM25 for the terms of `text`.
+
+        Args:
+            text (str): Free-text query.
+            top_k (int): Maximum number of pages returned.
+            documents (Sequence[str]): Only search pages of these documents.
+
+        Returns:
+            List[Dict]: Pages with id, document, page_num, page_hash and score (higher is better).
+        """
+        with self._lock:
+            terms = self._selective_terms(query_terms(text))
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        sql = (
+            "SELECT p.id, p.document, p.page_num, p.page_hash, bm25(pages_fts) AS rank "
+            "FROM pages_fts JOIN pages p ON p.rowid = pages_fts.rowid WHERE pages_fts MATCH ?"
+        )
+        params = [match]
+        if documents:
+            sql += f" AND p.document IN ({','.join('?' * len(documents))})"
+            params.extend(documents)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(top_k)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        # FTS5's bm25() is negative, lower meaning more relevant
+        return [
+            {"id": row[0], "document": row[1], "page_num": row[2], "page_hash": row[3], "score": -row[4]}
+            for row in rows
+        ]
+
+    def _selective_terms(self, terms: List[str]) -> List[str]:
+        """
+        Drop terms that cannot match or that occur on more than MAX_TERM_DOC_FRACTION of the
+        pages: they add little to BM25 scores but make the search scan long posting lists.
+        """
+        words = {term: _WORD_PATTERN.findall(term) for term in terms}
+        unique_words = sorted({word for parts in words.values() for word in parts})
+        if not unique_words:
+            return []
+        document_frequency = dict(self._conn.execute(
+            f"SELECT term, doc FROM pages_vocab WHERE term IN ({','.join('?' * len(unique_words))})",
+            unique_words,
+        ).fetchall())
+        max_pages = max(MIN_PRUNED_TERM_PAGES, MAX_TERM_DOC_FRACTION * self._cached_page_count())
+        selective = []
+        for term, parts in words.items():
+            # A phrase occurs on at most as many pages as its rarest word
+            rarest = min(document_frequency.get(word, 0) for word in parts)
+            if 0 < rarest <= max_pages:
+                selective.append(term)
+        return selective
+
+    def _cached_page_count(self) -> int:
+        """Page count, recounted only after this or another connection changed the index."""
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._page_count is None or version != self._data_version:
+            self._page_count = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            self._data_version = version
+        return self._page_count
+
+    def page_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def close(self):
+        """Close the underlying SQLite connection."""
+        self._conn.close()
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Merge ranked id lists with reciprocal-rank fusion: score(id) = sum of 1 / (k + rank).
+
+    Returns:
+        List[Tuple[str, float]]: (id, fused score) pairs, best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_keyword_index() -> KeywordIndex:
+    """Return the process-wide keyword index shared by ingestion and retrieval."""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = KeywordIndex()
+    return _default_index
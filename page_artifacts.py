@@ -0,0 +1,216 @@
+"""Columnar (Parquet) page artifacts written by docling_to_s3 and read by s3_pinecone.
+
+Each page is one row. Text, table and layout fields live in their own columns and the
+page image is only referenced (see page_image_store), so readers that only need
+`contents` and `page_num` never decode the rest. Legacy JSON artifacts are still
+readable through the same iterator.
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Configuration
+ROW_GROUP_SIZE = 32  # Pages per Parquet row group
+READ_BATCH_SIZE = 64  # Pages decoded per streamed record batch
+
+_log = logging.getLogger(__name__)
+
+PAGE_SCHEMA = pa.schema([
+    ("document", pa.string()),
+    ("hash", pa.string()),
+    ("page_hash", pa.string()),
+    ("page_num", pa.int32()),
+    ("width_in_points", pa.float64()),
+    ("height_in_points", pa.float64()),
+    ("dpi", pa.float64()),
+    ("contents", pa.string()),
+    ("contents_md", pa.string()),
+    ("contents_dt", pa.string()),
+    ("cells", pa.string()),  # JSON-encoded list of table cells
+    ("segments", pa.string()),  # JSON-encoded list of layout segments
+    ("image_width", pa.int32()),
+    ("image_height", pa.int32()),
+    ("image_format", pa.string()),
+    ("image_ref", pa.string()),  # s3:// reference into the page image store
+    ("image", pa.binary()),  # Inline encoded image, only when no image store is used
+])
+
+# Fields that live under "extra" in the page record
+_EXTRA_COLUMNS = ("page_num", "width_in_points", "height_in_points", "dpi")
+_JSON_COLUMNS = ("cells", "segments")
+# Logical field names accepted by the readers, mapped to their physical columns
+_FIELD_COLUMNS = {
+    "image": ["image_width", "image_height", "image_format", "image_ref", "image"],
+    "extra": list(_EXTRA_COLUMNS),
+}
+
+
+def page_row_to_columns(row: dict) -> dict:
+    """Flatten a page row produced by docling_to_s3 into Parquet column values."""
+    extra = row.get("extra", {})
+    image = row.get("image") or {}
+    return {
+        "document": row.get("document"),
+        "hash": row.get("hash"),
+        "page_hash": row.get("page_hash"),
+        "page_num": extra.get("page_num"),
+        "width_in_points": extra.get("width_in_points"),
+        "height_in_points": extra.get("height_in_points"),
+        "dpi": extra.get("dpi"),
+        "contents": row.get("contents"),
+        "contents_md": row.get("contents_md"),
+        "contents_dt": row.get("contents_dt"),
+        "cells": json.dumps(row.get("cells", [])),
+        "segments": json.dumps(row.get("segments", [])),
+        "image_width": image.get("width"),
+        "image_height": image.get("height"),
+        "image_format": image.get("format"),
+        "image_ref": image.get("ref"),
+        "image": image.get("bytes"),
+    }
+
+
+def columns_to_page_record(values: dict) -> dict:
+    """Rebuild a page record in the legacy JSON shape from the columns that were read."""
+    record = {}
+    extra = {}
+    image = {}
+    for column, value in values.items():
+        if column in _EXTRA_COLUMNS:
+            extra[column] = value
+        elif column in _JSON_COLUMNS:
+            record[column] = json.loads(value) if value else []
+        elif column == "image_width":
+            image["width"] = value
+        elif column == "image_height":
+            image["height"] = value
+        elif column == "image_format":
+            image["format"] = value
+        elif column == "image_ref":
+            image["ref"] = value
+        elif column == "image":
+            image["bytes"] = value
+        else:
+            record[column] = value
+    if extra:
+        record["extra"] = extra
+    if image:
+        record["image"] = image
+    return record
+
+
+class PageArtifactWriter:
+    """Stream page rows into a Parquet artifact one row group at a time."""
+
+    def __init__(self, path, row_group_size: int = ROW_GROUP_SIZE):
+        self.path = path
+        self.row_group_size = row_group_size
+        self._buffer = []
+        self._writer = pq.ParquetWriter(str(path), PAGE_SCHEMA, compression="zstd")
+
+    def write_rows(self, rows: Iterable[dict]):
+        """Buffer rows and flush every full row group."""
+        for row in rows:
+            self._buffer.append(page_row_to_columns(row))
+            if len(self._buffer) >= self.row_group_size:
+                self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._writer.write_table(pa.Table.from_pylist(self._buffer, schema=PAGE_SCHEMA))
+            self._buffer = []
+
+    def close(self):
+        """Flush remaining rows and finalize the file footer."""
+        self._flush()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_page_artifact(rows: Iterable[dict], path, row_group_size: int = ROW_GROUP_SIZE):
+    """Write page rows to a Parquet artifact at path."""
+    with PageArtifactWriter(path, row_group_size=row_group_size) as writer:
+        writer.write_rows(rows)
+    return path
+
+
+def _resolve_columns(fields: Optional[List[str]]) -> Optional[List[str]]:
+    """Translate logical field names into physical Parquet columns."""
+    if fields is None:
+        return None
+    columns = []
+    for field in fields:
+        for column in _FIELD_COLUMNS.get(field, [field]):
+            if column not in PAGE_SCHEMA.names:
+                raise ValueError(f"Unknown page artifact field: {field}")
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def iter_parquet_page_records(source, fields: Optional[List[str]] = None, batch_size: int = READ_BATCH_SIZE) -> Iterator[dict]:
+    """
+    Stream page records from a Parquet artifact, decoding only the requested fields.
+
+    Args:
+        source: Path or seekable binary file object.
+        fields (Optional[List[str]]): Fields to read, e.g. ["contents", "cells", "page_num"].
+            "image" and "extra" expand to their underlying columns. None reads everything.
+        batch_size (int): Number of rows decoded at a time.
+
+    Yields:
+        dict: Page records in the legacy JSON shape (with page_num under "extra").
+    """
+    parquet_file = pq.ParquetFile(source)
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=_resolve_columns(fields)):
+        for values in batch.to_pylist():
+            yield columns_to_page_record(values)
+
+
+def iter_json_page_records(source) -> Iterator[dict]:
+    """Yield page records from a legacy JSON artifact (path or text file object)."""
+    if isinstance(source, (str, Path)):
+        with open(source, "r") as f:
+            data = json.load(f)
+    else:
+        data = json.load(source)
+    yield from data
+
+
+def iter_page_records(source, fields: Optional[List[str]] = None, artifact_format: Optional[str] = None) -> Iterator[dict]:
+    """
+    Yield page records from a Parquet or legacy JSON artifact.
+
+    Args:
+        source: Path or file object of the artifact.
+        fields (Optional[List[str]]): Fields to read from Parquet artifacts. JSON
+            artifacts always return full records.
+        artifact_format (Optional[str]): "parquet" or "json"; inferred from the
+            path suffix when omitted.
+    """
+    if artifact_format is None:
+        artifact_format = artifact_format_for(str(getattr(source, "name", source)))
+    if artifact_format == "parquet":
+        return iter_parquet_page_records(source, fields)
+    if artifact_format == "json":
+        return iter_json_page_records(source)
+    raise ValueError(f"Unsupported page artifact format: {artifact_format}")
+
+
+def artifact_format_for(key: str) -> Optional[str]:
+    """Return the artifact format for a file name or S3 key, or None if it is not an artifact."""
+    if key.endswith(".parquet"):
+        return "parquet"
+    if key.endswith(".json"):
+        return "json"
+    return None
@@ -0,0 +1,107 @@
+import io
+import logging
+import threading
+
+from botocore.exceptions import ClientError
+
+from s3_io import get_s3_client
+
+# Configuration
+S3_BUCKET_NAME = 'team9-project4'
+S3_IMAGE_FOLDER = 'page_images/'
+IMAGE_FORMAT = "WEBP"  # "WEBP" or "PNG"
+WEBP_QUALITY = 85
+
+_log = logging.getLogger(__name__)
+
+_CONTENT_TYPES = {"WEBP": "image/webp", "PNG": "image/png"}
+
+
+def encode_page_image(image, image_format: str = IMAGE_FORMAT) -> bytes:
+    """
+    Compress a PIL page image.
+
+    Args:
+        image: PIL image rendered by Docling.
+        image_format (str): "WEBP" or "PNG".
+
+    Returns:
+        bytes: The encoded image.
+    """
+    buffer = io.BytesIO()
+    if image_format == "WEBP":
+        image.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=4)
+    else:
+        image.save(buffer, format=image_format, optimize=True)
+    return buffer.getvalue()
+
+
+class PageImageStore:
+    """
+    Content-addressed store of compressed page images in S3, keyed by Docling page_hash.
+
+    Images are written once: keys that already exist are skipped, so re-running the
+    conversion of an unchanged document uploads nothing.
+    """
+
+    def __init__(self, bucket_name: str = S3_BUCKET_NAME, prefix: str = S3_IMAGE_FOLDER,
+                 image_format: str = IMAGE_FORMAT, s3_client=None):
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.image_format = image_format
+        self.s3_client = s3_client or get_s3_client()
+        self._known_keys = set()
+        self._lock = threading.Lock()
+
+    def key_for(self, page_hash: str) -> str:
+        """Return the S3 key of the image for a page hash."""
+        return f"{self.prefix}{page_hash}.{self.image_format.lower()}"
+
+    def ref_for(self, page_hash: str) -> str:
+        """Return the s3:// reference stored in page records."""
+        return f"s3://{self.bucket_name}/{self.key_for(page_hash)}"
+
+    def exists(self, page_hash: str) -> bool:
+        """Check whether the image for a page hash has already been stored."""
+        key = self.key_for(page_hash)
+        with self._lock:
+            if key in self._known_keys:
+                return True
+        try:
+            self.s3_client.head_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        with self._lock:
+            self._known_keys.add(key)
+        return True
+
+    def put(self, page_hash: str, image) -> str:
+        """
+        Compress and store a page image unless it already exists.
+
+        Args:
+            page_hash (str): Docling page hash used as the content address.
+            image: PIL image to store.
+
+        Returns:
+            str: The s3:// reference of the stored image.
+        """
+        if not self.exists(page_hash):
+            key = self.key_for(page_hash)
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=encode_page_image(image, self.image_format),
+                ContentType=_CONTENT_TYPES.get(self.image_format, "application/octet-stream"),
+            )
+            with self._lock:
+                self._known_keys.add(key)
+            _log.debug(f"Stored page image s3://{self.bucket_name}/{key}")
+        return self.ref_for(page_hash)
+
+    def get(self, page_hash: str) -> bytes:
+        """Return the encoded image bytes for a page hash."""
+        response = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.key_for(page_hash))
+        return response["Body"].read()
@@ -1,58 +1,263 @@
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
 import openai
 import pinecone
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional, Sequence, Tuple
+from answer_cache import SemanticAnswerCache, context_fingerprint
+from content_store import get_content_store
+from context_packing import CONTEXT_TOKEN_BUDGET, OVERFETCH_FACTOR, pack_context
+from embedding_cache import EmbeddingCache
+from keyword_index import get_keyword_index, reciprocal_rank_fusion
+from local_vector_index import VECTOR_BACKEND, open_local_index
 
 # Configuration - Replace with your actual API keys and index information
 PINECONE_API_KEY = ''
 OPENAI_API_KEY = ''
 INDEX_NAME = 'team9-project4-vector'
 EMBEDDING_MODEL_NAME = "text-embedding-ada-002"  # Model for embeddings
+QUERY_CACHE_SIZE = 2048  # Query embeddings kept in memory (least recently used are evicted)
+QUERY_CACHE_PATH = None  # e.g. Path("./query_embedding_cache.sqlite3") to share embeddings across workers
+QUERY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+ANSWER_CACHE_SIZE = 4096  # Generated answers kept for near-duplicate questions
+ANSWER_CACHE_THRESHOLD = 0.97  # Minimum query cosine similarity for reusing an answer
+HYBRID_RETRIEVAL = True  # Fuse BM25 keyword hits with vector hits
+HYBRID_CANDIDATES = 2  # Each retriever contributes top_k * HYBRID_CANDIDATES candidates to fusion
+RRF_K = 60  # Reciprocal-rank fusion constant
+CONTEXT_PACKING = True  # Over-fetch, deduplicate with MMR and pack the context into CONTEXT_TOKEN_BUDGET
+
+# In-process tier of the query embedding cache: cache key -> embedding, in least recently used order
+_query_cache = OrderedDict()
+_query_cache_lock = threading.Lock()
+_query_cache_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+_query_disk_cache = None
+
+# Keyword searches run here, concurrently with the vector query
+_keyword_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="keyword-search")
+
+# Answers reused for near-duplicate questions over the same retrieved pages
+answer_cache = SemanticAnswerCache(ANSWER_CACHE_SIZE, threshold=ANSWER_CACHE_THRESHOLD)
 
 # Initialize APIs
 def initialize_apis() -> pinecone.Index:
     """
     Initialize OpenAI and Pinecone with provided API keys and return Pinecone index.
+
+    With VECTOR_BACKEND=local the on-disk LocalVectorIndex is returned instead.
     """
     openai.api_key = OPENAI_API_KEY
+    if VECTOR_BACKEND == "local":
+        return open_local_index(INDEX_NAME)
     pinecone.init(api_key=PINECONE_API_KEY, environment="us-west1-gcp")  # Update environment if needed
     return pinecone.Index(INDEX_NAME)
 
+def normalize_query(query: str) -> str:
+    """Normalize a query for caching: Unicode NFKC, lowercase, collapsed whitespace, no trailing punctuation."""
+    query = unicodedata.normalize("NFKC", query).lower()
+    return re.sub(r"\s+", " ", query).strip().rstrip("?!.").strip()
+
+
+def query_cache_key(query: str, model: str = EMBEDDING_MODEL_NAME) -> str:
+    """Return the cache key of a query embedding: a hash of the normalized query and the model."""
+    return hashlib.sha256(f"{model}\n{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+
+def get_query_disk_cache():
+    """Return the shared on-disk query embedding cache, or None when QUERY_CACHE_PATH is not set."""
+    global _query_disk_cache
+    if QUERY_CACHE_PATH is None:
+        return None
+    with _query_cache_lock:
+        if _query_disk_cache is None:
+            _query_disk_cache = EmbeddingCache(Path(QUERY_CACHE_PATH), max_bytes=QUERY_CACHE_MAX_BYTES)
+    return _query_disk_cache
+
+
+def _remember_query_embedding(key: str, embedding: List[float]):
+    with _query_cache_lock:
+        _query_cache[key] = embedding
+        _query_cache.move_to_end(key)
+        while len(_query_cache) > QUERY_CACHE_SIZE:
+            _query_cache.popitem(last=False)
+
+
+def query_embedding_cache_stats() -> Dict[str, float]:
+    """Return hit/miss counters of the query embedding cache."""
+    with _query_cache_lock:
+        stats = dict(_query_cache_stats)
+        stats["entries"] = len(_query_cache)
+    lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+    stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+    return stats
+
+
 # Function to create embeddings
 def get_query_embedding(query: str) -> List[float]:
     """
     Generate embedding for a query using OpenAI's API.
 
+    Embeddings are cached by normalized query text and model, in memory and, when
+    QUERY_CACHE_PATH is set, in a SQLite file shared by every worker process.
+
     Args:
         query (str): The query string to embed.
 
     Returns:
         List[float]: The embedding vector for the query.
     """
+    key = query_cache_key(query)
+    with _query_cache_lock:
+        embedding = _query_cache.get(key)
+        if embedding is not None:
+            _query_cache.move_to_end(key)
+            _query_cache_stats["memory_hits"] += 1
+            return embedding
+
+    disk_cache = get_query_disk_cache()
+    if disk_cache is not None:
+        cached = disk_cache.get_many([key], EMBEDDING_MODEL_NAME).get(key)
+        if cached is not None:
+            _remember_query_embedding(key, cached["embedding"])
+            with _query_cache_lock:
+                _query_cache_stats["disk_hits"] += 1
+            return cached["embedding"]
+
     response = openai.Embedding.create(input=query, model=EMBEDDING_MODEL_NAME)
-    return response['data'][0]['embedding']
+    embedding = response['data'][0]['embedding']
+    with _query_cache_lock:
+        _query_cache_stats["misses"] += 1
+    _remember_query_embedding(key, embedding)
+    if disk_cache is not None:
+        disk_cache.put_many({key: embedding}, EMBEDDING_MODEL_NAME)
+    return embedding
+
+def document_filter(documents: Optional[Sequence[str]]) -> Optional[dict]:
+    """Return the metadata filter restricting a vector query to the given documents (None for all)."""
+    if not documents:
+        return None
+    return {"document": {"$in": list(documents)}}
+
+def hydrate_content(context: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Fill in the "content" of retrieved items from the content store with one batched lookup."""
+    try:
+        stored = get_content_store().get_many(item["id"] for item in context)
+    except Exception as e:
+        print(f"Content store lookup failed; using metadata previews: {e}")
+        return context
+    for item in context:
+        if item["id"] in stored:
+            item["content"] = stored[item["id"]]["text"]
+    return context
 
 # Function to retrieve context from Pinecone
-def retrieve_context(index, query_embedding: List[float], top_k: int = 5) -> List[Dict[str, str]]:
+def retrieve_context(index, query_embedding: List[float], top_k: int = 5,
+                     keyword_query: str = None, include_values: bool = False,
+                     documents: Sequence[str] = None) -> List[Dict[str, str]]:
     """
     Retrieve relevant documents from Pinecone based on query embedding.
 
+    When keyword_query is given (and HYBRID_RETRIEVAL is on), a BM25 keyword search runs
+    concurrently with the vector query and both rankings are merged with reciprocal-rank
+    fusion, so exact terms such as tickers or statute numbers are not missed. The text of
+    the returned items is read from the content store (see hydrate_content).
+
     Args:
         index: Pinecone index instance.
         query_embedding (List[float]): Embedding vector for the query.
         top_k (int): Number of top results to retrieve.
+        keyword_query (str): Query text for the keyword search.
+        include_values (bool): Whether to return each vector hit's embedding as "values".
+        documents (Sequence[str]): Only search pages of these documents (all when empty).
 
     Returns:
-        List[Dict[str, str]]: List of relevant documents with metadata.
+        List[Dict[str, str]]: List of relevant documents with metadata and a retrieval score.
     """
-    results = index.query(vector=query_embedding, top_k=top_k, include_metadata=True)
-    return [
+    keyword_future = None
+    if keyword_query and HYBRID_RETRIEVAL:
+        keyword_future = _keyword_executor.submit(
+            lambda: get_keyword_index().search(keyword_query, top_k * HYBRID_CANDIDATES, documents=documents)
+        )
+
+    # Document-scoped queries filter on the "document" metadata stored with every vector
+    scope = {"filter": document_filter(documents)} if documents else {}
+    results = index.query(
+        vector=query_embedding,
+        top_k=top_k * HYBRID_CANDIDATES if keyword_future else top_k,
+        include_metadata=True,
+        include_values=include_values,
+        **scope
+    )
+    context = [
         {
+            "id": match['id'],
+            "page_hash": match['metadata'].get("page_hash", ""),
             "document": match['metadata'].get("document", "Unknown Document"),
             "page_num": match['metadata'].get("page_num", "Unknown Page"),
-            "content": match['metadata'].get("content", "")
+            # Short metadata preview, replaced by the full text from the content store
+            "content": match['metadata'].get("text_preview", ""),
+            "score": match['score'],
+            **({"values": match['values']} if include_values else {})
         }
         for match in results['matches']
     ]
+    if keyword_future is None:
+        return hydrate_content(context)
+
+    try:
+        keyword_hits = keyword_future.result()
+    except Exception as e:
+        print(f"Keyword search failed; using vector results only: {e}")
+        return hydrate_content(context[:top_k])
+
+    pages = {page["id"]: page for page in context}
+    for hit in keyword_hits:
+        pages.setdefault(hit["id"], {
+            "id": hit["id"],
+            "page_hash": hit["page_hash"] or "",
+            "document": hit["document"],
+            "page_num": hit["page_num"],
+            "content": ""
+        })
+    fused = reciprocal_rank_fusion(
+        [[page["id"] for page in context], [hit["id"] for hit in keyword_hits]], k=RRF_K
+    )
+    return hydrate_content([dict(pages[page_id], score=score) for page_id, score in fused[:top_k]])
+
+def assemble_context(index, query: str, query_embedding: List[float], top_k: int = 5,
+                     documents: Sequence[str] = None) -> Tuple[List[Dict[str, str]], Dict[str, int]]:
+    """
+    Retrieve the prompt context for a query.
+
+    With CONTEXT_PACKING, top_k * OVERFETCH_FACTOR candidates are retrieved with their
+    vectors, near-duplicates are dropped with maximal marginal relevance and at most top_k
+    items are packed into CONTEXT_TOKEN_BUDGET tokens. Retrieval is limited to `documents`
+    when given.
+
+    Returns:
+        Tuple[List[Dict[str, str]], Dict[str, int]]: The context and a token report
+        (see context_packing.pack_context), or None as report without packing.
+    """
+    if not CONTEXT_PACKING:
+        return retrieve_context(index, query_embedding, top_k, keyword_query=query, documents=documents), None
+    candidates = retrieve_context(
+        index, query_embedding, top_k * OVERFETCH_FACTOR, keyword_query=query, include_values=True,
+        documents=documents
+    )
+    return pack_context(candidates, query_embedding, top_k, format_context_item, CONTEXT_TOKEN_BUDGET)
+
+def format_context_item(item: Dict[str, str]) -> str:
+    """Render one retrieved item as it appears in the prompt."""
+    return f"Document: {item['document']}, Page: {item['page_num']}\nContent: {item['content']}"
+
+def build_prompt(query: str, context: List[Dict[str, str]]) -> str:
+    """Format the retrieved context and the question into the chat prompt."""
+    context_text = "\n\n".join(format_context_item(item) for item in context)
+    return f"Using the following context, answer the question:\n\nContext:\n{context_text}\n\nQuestion: {query}\nAnswer:"
 
 # Function to generate an answer based on context and query
 def generate_answer(query: str, context: List[Dict[str, str]]) -> str:
@@ -67,10 +272,7 @@ def generate_answer(query: str, context: List[Dict[str, str]]) -> str:
         str: The generated answer.
     """
     # Format retrieved context for the language model
-    context_text = "\n\n".join(
-        [f"Document: {item['document']}, Page: {item['page_num']}\nContent: {item['content']}" for item in context]
-    )
-    prompt = f"Using the following context, answer the question:\n\nContext:\n{context_text}\n\nQuestion: {query}\nAnswer:"
+    prompt = build_prompt(query, context)
 
     response = openai.ChatCompletion.create(
         model="gpt-3.5-turbo",
@@ -80,16 +282,46 @@ def generate_answer(query: str, context: List[Dict[str, str]]) -> str:
     )
     return response['choices'][0]['message']['content'].strip()
 
+def generate_answer_stream(query: str, context: List[Dict[str, str]]) -> Iterator[str]:
+    """
+    Generate an answer like generate_answer, yielding tokens as the model produces them.
+
+    Args:
+        query (str): The question or query.
+        context (List[Dict[str, str]]): Retrieved context from Pinecone.
+
+    Yields:
+        str: Answer text fragments in order.
+    """
+    response = openai.ChatCompletion.create(
+        model="gpt-3.5-turbo",
+        messages=[{"role": "user", "content": build_prompt(query, context)}],
+        max_tokens=200,
+        temperature=0.7,
+        stream=True
+    )
+    for chunk in response:
+        token = chunk['choices'][0].get('delta', {}).get('content')
+        if token:
+            yield token
+
 # Main function to handle RAG query answering
-def rag_query_answer(query: str, index, top_k: int = 5, return_metadata: bool = False) -> str:
+def rag_query_answer(query: str, index, top_k: int = 5, return_metadata: bool = False,
+                     use_answer_cache: bool = True, documents: Sequence[str] = None) -> str:
     """
     Retrieve relevant context from Pinecone and generate an answer to the query.
 
+    A near-duplicate of an earlier question that retrieves the same pages (same ids and
+    page hashes) reuses the earlier answer instead of calling the chat model. The metadata
+    includes the context token report of assemble_context as "context_tokens".
+
     Args:
         query (str): The input query.
         index: Pinecone index instance.
         top_k (int): Number of top results to retrieve from Pinecone.
         return_metadata (bool): Whether to return metadata along with the answer.
+        use_answer_cache (bool): Whether to reuse answers of semantically similar questions.
+        documents (Sequence[str]): Answer only from these documents (all when empty).
 
     Returns:
         str or tuple: The generated answer, optionally with metadata.
@@ -98,16 +330,65 @@ def rag_query_answer(query: str, index, top_k: int = 5, return_metadata: bool =
         # Generate query embedding
         query_embedding = get_query_embedding(query)
         
-        # Retrieve relevant context from Pinecone
-        context = retrieve_context(index, query_embedding, top_k)
+        # Retrieve relevant context from Pinecone, deduplicated and packed into the token budget
+        context, token_report = assemble_context(index, query, query_embedding, top_k, documents=documents)
         
+        # Reuse the answer of a near-duplicate question over the same pages
+        fingerprint = context_fingerprint(context)
+        answer = answer_cache.get(query_embedding, fingerprint) if use_answer_cache else None
+        cached = answer is not None
+
         # Generate an answer based on the retrieved context
-        answer = generate_answer(query, context)
-        metadata = {"query_context": context}
+        if not cached:
+            answer = generate_answer(query, context)
+            if use_answer_cache:
+                answer_cache.put(query_embedding, fingerprint, answer)
+        metadata = {"query_context": context, "cached_answer": cached, "context_tokens": token_report}
         return (answer, metadata) if return_metadata else answer
     except Exception as e:
         return f"An error occurred: {e}"
 
+# Streaming variant of rag_query_answer
+def rag_query_stream(query: str, index, top_k: int = 5, use_answer_cache: bool = True,
+                     documents: Sequence[str] = None) -> Iterator[Tuple[str, object]]:
+    """
+    Answer a query like rag_query_answer, yielding events as soon as they are available.
+
+    Events are ("sources", context) once retrieval finishes, then ("token", text) for each
+    answer fragment, then ("done", {"cached_answer": bool, "context_tokens": report}). A failure yields
+    ("error", message) and ends the stream.
+
+    Args:
+        query (str): The input query.
+        index: Pinecone index instance.
+        top_k (int): Number of top results to retrieve from Pinecone.
+        use_answer_cache (bool): Whether to reuse answers of semantically similar questions.
+        documents (Sequence[str]): Answer only from these documents (all when empty).
+
+    Yields:
+        Tuple[str, object]: Event name and payload.
+    """
+    try:
+        query_embedding = get_query_embedding(query)
+        context, token_report = assemble_context(index, query, query_embedding, top_k, documents=documents)
+        yield "sources", context
+
+        fingerprint = context_fingerprint(context)
+        answer = answer_cache.get(query_embedding, fingerprint) if use_answer_cache else None
+        cached = answer is not None
+        if cached:
+            yield "token", answer
+        else:
+            tokens = []
+            for token in generate_answer_stream(query, context):
+                tokens.append(token)
+                yield "token", token
+            if use_answer_cache:
+                answer_cache.put(query_embedding, fingerprint, "".join(tokens).strip())
+        yield "done", {"cached_answer": cached, "context_tokens": token_report}
+    except Exception as e:
+        yield "error", f"An error occurred: {e}"
+
 # Example Usage
 if __name__ == "__main__":
     index = initialize_apis()
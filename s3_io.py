@@ -0,0 +1,190 @@
+"""Shared S3 I/O for the ingestion scripts.
+
+Set S3_ENDPOINT_URL to point every client at a local S3 stand-in (MinIO, moto server)
+instead of AWS.
+"""
+
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+# Configuration
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")  # e.g. http://localhost:9000 for a local stand-in
+MAX_POOL_CONNECTIONS = 32
+TRANSFER_WORKERS = 8  # Files transferred concurrently
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=16 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=4,  # Parts transferred concurrently per file
+)
+RANGE_READ_SIZE = 1024 * 1024  # Minimum bytes fetched per ranged GET
+
+_log = logging.getLogger(__name__)
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """Return the process-wide S3 client, creating it on first use (and again after a fork)."""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client_pid = os.getpid()
+            _client = boto3.client(
+                's3',
+                endpoint_url=S3_ENDPOINT_URL,
+                config=Config(max_pool_connections=MAX_POOL_CONNECTIONS, retries={"mode": "adaptive"}),
+            )
+    return _client
+
+
+def iter_objects(bucket_name: str, prefix: str, suffixes: Optional[Tuple[str, ...]] = None, s3_client=None) -> Iterator[dict]:
+    """
+    Yield every object under a prefix, following pagination past 1000 keys.
+
+    Args:
+        bucket_name (str): S3 bucket.
+        prefix (str): Key prefix to list.
+        suffixes (Optional[Tuple[str, ...]]): Only yield keys ending with one of these.
+
+    Yields:
+        dict: list_objects_v2 entries (Key, ETag, Size, LastModified).
+    """
+    s3_client = s3_client or get_s3_client()
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        for item in page.get('Contents', []):
+            if suffixes is None or item['Key'].endswith(suffixes):
+                yield item
+
+
+def list_keys(bucket_name: str, prefix: str, suffixes: Optional[Tuple[str, ...]] = None, s3_client=None) -> List[str]:
+    """List every key under a prefix, optionally filtered by suffix."""
+    return [item['Key'] for item in iter_objects(bucket_name, prefix, suffixes, s3_client)]
+
+
+def download_files(bucket_name: str, downloads: Dict[str, Path], max_workers: int = TRANSFER_WORKERS, s3_client=None) -> Dict[str, Path]:
+    """
+    Download several objects concurrently using multipart transfers.
+
+    Args:
+        bucket_name (str): S3 bucket.
+        downloads (Dict[str, Path]): Maps S3 key to local destination path.
+        max_workers (int): Number of files transferred at once.
+
+    Returns:
+        Dict[str, Path]: The same mapping, once every download has completed.
+    """
+    s3_client = s3_client or get_s3_client()
+
+    def download(item):
+        s3_key, local_path = item
+        Path(local_path).parent.mkdir(parents=True, exist_ok=True)
+        s3_client.download_file(bucket_name, s3_key, str(local_path), Config=TRANSFER_CONFIG)
+        _log.info(f"Downloaded s3://{bucket_name}/{s3_key} to {local_path}")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(download, downloads.items()))
+    return downloads
+
+
+def upload_files(bucket_name: str, uploads: Dict[Path, str], max_workers: int = TRANSFER_WORKERS, s3_client=None) -> Dict[Path, str]:
+    """
+    Upload several local files concurrently using multipart transfers.
+
+    Args:
+        bucket_name (str): S3 bucket.
+        uploads (Dict[Path, str]): Maps local path to destination S3 key.
+        max_workers (int): Number of files transferred at once.
+
+    Returns:
+        Dict[Path, str]: The same mapping, once every upload has completed.
+    """
+    s3_client = s3_client or get_s3_client()
+
+    def upload(item):
+        local_path, s3_key = item
+        s3_client.upload_file(str(local_path), bucket_name, s3_key, Config=TRANSFER_CONFIG)
+        _log.info(f"Uploaded {local_path} to s3://{bucket_name}/{s3_key}")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(upload, uploads.items()))
+    return uploads
+
+
+def open_object_stream(bucket_name: str, s3_key: str, s3_client=None):
+    """Return a streaming, read-once body for an object (suitable for json.load)."""
+    s3_client = s3_client or get_s3_client()
+    return s3_client.get_object(Bucket=bucket_name, Key=s3_key)['Body']
+
+
+class S3RangeReader(io.RawIOBase):
+    """
+    Seekable read-only file object over an S3 object, backed by ranged GET requests.
+
+    Columnar readers (pyarrow) seek to the footer and then to the column chunks they
+    need, so only those byte ranges are transferred.
+    """
+
+    def __init__(self, bucket_name: str, s3_key: str, s3_client=None, size: Optional[int] = None):
+        self.bucket_name = bucket_name
+        self.key = s3_key
+        self.name = s3_key
+        self.s3_client = s3_client or get_s3_client()
+        if size is None:
+            size = self.s3_client.head_object(Bucket=bucket_name, Key=s3_key)['ContentLength']
+        self.size = size
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        return self._position
+
+    def readinto(self, buffer):
+        if self._position >= self.size:
+            return 0
+        end = min(self._position + len(buffer), self.size) - 1
+        response = self.s3_client.get_object(
+            Bucket=self.bucket_name, Key=self.key, Range=f"bytes={self._position}-{end}"
+        )
+        data = response['Body'].read()
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+
+def open_object_seekable(bucket_name: str, s3_key: str, s3_client=None, buffer_size: int = RANGE_READ_SIZE):
+    """Return a buffered, seekable file object that reads an S3 object with ranged GETs."""
+    return io.BufferedReader(S3RangeReader(bucket_name, s3_key, s3_client), buffer_size=buffer_size)
+
+
+def upload_bytes(bucket_name: str, s3_key: str, data: bytes, s3_client=None, **extra_args):
+    """Upload an in-memory payload to S3."""
+    s3_client = s3_client or get_s3_client()
+    s3_client.put_object(Bucket=bucket_name, Key=s3_key, Body=data, **extra_args)
@@ -1,111 +1,607 @@
-import boto3
+import datetime
 import json
 import openai
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pinecone import Pinecone, ServerlessSpec
 from pathlib import Path
 import os
+import s3_io
+from chunking import iter_chunks
+from content_store import get_content_store
+from document_catalog import DocumentCatalog, catalog_entry_from_record
+from embedding_cache import EmbeddingCache
+from local_vector_index import VECTOR_BACKEND, open_local_index
+from ingestion_manifest import DONE, IngestionManifest
+from keyword_index import get_keyword_index
+from page_artifacts import artifact_format_for, iter_page_records
 
 # Configuration Section
 # Configuration Section - Replace these variables or use TOML for secure handling
 PINECONE_API_KEY = ''
 OPENAI_API_KEY = ''
 S3_BUCKET_NAME = 'team9-project4'
-S3_FOLDER_PATH = 'output_json/'  # Path to the folder containing JSON files in S3
+S3_SOURCE_FOLDER = 'input_pdfs/'  # Source PDFs; documents deleted here are removed from the index
+S3_FOLDER_PATH = 'output_json/'  # Path to the folder containing page artifacts (Parquet or JSON) in S3
 INDEX_NAME = 'team9-project4-vector'
+EMBEDDING_MODEL = "text-embedding-ada-002"
 
-# Initialize Pinecone and OpenAI
+# Batched ingestion settings
+EMBED_BATCH_SIZE = 64  # Pages read per batch, and texts sent in a single embedding request
+UPSERT_BATCH_SIZE = 100  # Maximum vectors per upsert request
+MAX_UPSERT_BYTES = 2 * 1024 * 1024  # Pinecone rejects upsert requests above 2MB
+MAX_INFLIGHT_BATCHES = 4  # Embedding/upsert batches processed concurrently
+
+# Only these fields are decoded from columnar page artifacts
+PAGE_FIELDS = ["page_hash", "contents", "cells", "segments", "page_num", "image_width", "image_height"]
+
+# Embed token-bounded chunks of each page (see chunking.py) instead of one vector per page
+CHUNKING = True
+
+# Characters of text kept in vector metadata; retrieval falls back to them when the
+# content store (CONTENT_STORE_PATH) has no entry for a vector
+TEXT_PREVIEW_CHARS = 500
+
+# Embedding cache keyed by chunk content hash (Docling page_hash without chunking) + embedding model
+EMBEDDING_CACHE_PATH = Path("./embedding_cache.sqlite3")
+EMBEDDING_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Initialize OpenAI
 openai.api_key = OPENAI_API_KEY
-pc = Pinecone(api_key=PINECONE_API_KEY)
-if INDEX_NAME not in pc.list_indexes().names():
-    pc.create_index(
-        name=INDEX_NAME,
-        dimension=1536,
-        metric='cosine',
-        spec=ServerlessSpec(cloud='aws', region='us-west-2')
-    )
-index = pc.Index(INDEX_NAME)
 
 # Initialize AWS S3 Client
-s3_client = boto3.client('s3')
+s3_client = s3_io.get_s3_client()
+
+# Pinecone index and embedding cache are created on first use, so importing this module
+# (e.g. from the Airflow DAG) has no side effects. They are first used inside the
+# MAX_INFLIGHT_BATCHES worker threads, so creation is guarded by a lock.
+_index = None
+_index_lock = threading.Lock()
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+def get_pinecone_index():
+    """
+    Return the Pinecone index, creating the index on first use if it does not exist.
+
+    With VECTOR_BACKEND=local the vectors go to a LocalVectorIndex on disk instead.
+    """
+    global _index
+    with _index_lock:
+        if _index is None and VECTOR_BACKEND == "local":
+            _index = open_local_index(INDEX_NAME, dimension=1536)
+        if _index is None:
+            pc = Pinecone(api_key=PINECONE_API_KEY)
+            if INDEX_NAME not in pc.list_indexes().names():
+                pc.create_index(
+                    name=INDEX_NAME,
+                    dimension=1536,
+                    metric='cosine',
+                    spec=ServerlessSpec(cloud='aws', region='us-west-2')
+                )
+            _index = pc.Index(INDEX_NAME)
+    return _index
+
+def get_embedding_cache():
+    """Return the embedding cache, opening it on first use."""
+    global _embedding_cache
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, max_bytes=EMBEDDING_CACHE_MAX_BYTES)
+    return _embedding_cache
 
 def list_json_files_in_s3(bucket_name: str, folder_path: str):
-    """List all JSON files in a specific S3 folder."""
-    response = s3_client.list_objects_v2(Bucket=bucket_name, Prefix=folder_path)
-    return [item['Key'] for item in response.get('Contents', []) if item['Key'].endswith('.json')]
+    """List all page artifacts (Parquet or legacy JSON) in a specific S3 folder."""
+    return [
+        key for key in s3_io.list_keys(bucket_name, folder_path, s3_client=s3_client)
+        if artifact_format_for(key)
+    ]
 
 def download_json_from_s3(bucket_name: str, s3_key: str, download_path: Path):
-    """Download JSON file from S3 bucket."""
-    s3_client.download_file(bucket_name, s3_key, str(download_path))
+    """Download a page artifact from S3 bucket."""
+    s3_io.download_files(bucket_name, {s3_key: download_path}, s3_client=s3_client)
     print(f"Downloaded {s3_key} from S3 bucket {bucket_name} to {download_path}.")
 
+def open_artifact_from_s3(bucket_name: str, s3_key: str):
+    """
+    Open a page artifact in S3 for streaming reads, without a temp-file round trip.
+
+    Parquet artifacts are opened as seekable ranged readers so only the footer and the
+    requested columns are transferred; JSON artifacts are streamed from the response body.
+    """
+    if artifact_format_for(s3_key) == "parquet":
+        return s3_io.open_object_seekable(bucket_name, s3_key, s3_client=s3_client)
+    return s3_io.open_object_stream(bucket_name, s3_key, s3_client=s3_client)
+
 def generate_embedding(text: str):
     """Generate embedding for a given text using OpenAI."""
-    response = openai.Embedding.create(input=text, model="text-embedding-ada-002")
+    response = openai.Embedding.create(input=text, model=EMBEDDING_MODEL)
     embedding = response['data'][0]['embedding']
     return embedding
 
-def process_and_upload_to_pinecone(json_path: Path, document_name: str):
-    """Process JSON file and upload embeddings to Pinecone with additional metadata."""
-    with open(json_path, 'r') as f:
-        data = json.load(f)
+def generate_embeddings(texts):
+    """Generate embeddings for a list of texts with a single OpenAI request."""
+    response = openai.Embedding.create(input=texts, model=EMBEDDING_MODEL)
+    # The API may return items out of order; the index field is authoritative.
+    data = sorted(response['data'], key=lambda item: item['index'])
+    return [item['embedding'] for item in data]
+
+def build_page_metadata(page: dict, document_name: str):
+    """
+    Build the Pinecone metadata for a single page record.
+
+    Only small, filterable fields and a short text preview are kept; the full text and
+    table data go to the content store (see store_unit_content), which stays clear of
+    Pinecone's per-vector metadata size limit.
+    """
+    text_content = page.get('contents') or ""
+    image_data = page.get('image')
+
+    metadata = {
+        "document": document_name,
+        "page_num": page["extra"].get("page_num", "Unknown Page"),
+        # Changes when the page content changes; lets answer caches detect re-ingested pages
+        "page_hash": page.get("page_hash") or "",
+        "title": document_name,
+        "author": page.get("author", "Unknown Author"),
+        "has_table": bool(page.get('cells')),
+        "text_preview": text_content[:TEXT_PREVIEW_CHARS] if isinstance(text_content, str) else "",
+    }
+
+    # Only include image data if available
+    if image_data:
+        metadata["image"] = "Image data available"
+
+    return metadata
+
+def page_vector_id(page: dict, document_name: str):
+    """Return the Pinecone vector id of a page (the parent id of its chunks)."""
+    return f"{document_name}_{page['extra'].get('page_num', 'Unknown Page')}"
+
+def iter_index_units(pages, document_name: str):
+    """
+    Yield (page, unit) pairs for the vectors of each page, one page at a time.
+
+    With CHUNKING a unit is a chunk from chunking.iter_chunks; otherwise it is the whole
+    page under its page vector id. Units have id, parent_id, text, kinds and content_hash
+    (the embedding cache key).
+    """
+    if CHUNKING:
+        yield from iter_chunks(pages, lambda page: page_vector_id(page, document_name))
+        return
+    for page in pages:
+        parent_id = page_vector_id(page, document_name)
+        yield page, {
+            "id": parent_id,
+            "parent_id": parent_id,
+            "text": page.get('contents') or "No Text Available",
+            "kinds": "text+table",
+            "content_hash": page.get('page_hash') or "",
+        }
+
+def build_unit_metadata(page: dict, unit: dict, document_name: str):
+    """Build the Pinecone metadata for a unit from iter_index_units."""
+    metadata = build_page_metadata(page, document_name)
+    if unit["id"] != unit["parent_id"]:
+        metadata.update(
+            parent_id=unit["parent_id"],
+            chunk_index=unit["chunk_index"],
+            token_count=unit["token_count"],
+            has_table=metadata["has_table"] and "table" in unit["kinds"],
+            text_preview=unit["text"][:TEXT_PREVIEW_CHARS],
+        )
+    return metadata
+
+def store_unit_content(units, document_name: str):
+    """Write the full text of (page, unit) pairs (and table data of units with tables) to the content store."""
+    get_content_store().put_many(
+        {
+            "id": unit["id"],
+            "document": document_name,
+            "page_num": page["extra"].get("page_num"),
+            "page_hash": page.get("page_hash") or "",
+            "text": unit["text"],
+            "table": page.get("cells") if "table" in unit["kinds"] else None,
+        }
+        for page, unit in units
+    )
+
+def index_unit_keywords(units, document_name: str):
+    """Add (page, unit) pairs to the BM25 keyword index under their vector ids."""
+    get_keyword_index().add_pages(
+        (
+            unit["id"],
+            document_name,
+            page["extra"].get("page_num"),
+            page.get("page_hash") or "",
+            unit["text"],
+        )
+        for page, unit in units
+    )
+
+def process_and_upload_to_pinecone(json_path: Path, document_name: str, artifact_format: str = None):
+    """Process a page artifact and upload embeddings to Pinecone with additional metadata."""
+    vector_ids = []
+    pages = iter_page_records(json_path, fields=PAGE_FIELDS, artifact_format=artifact_format)
+    for page, unit in iter_index_units(pages, document_name):
+        # Generate embedding for the chunk text
+        embedding = generate_embedding(unit["text"])
+
+        # Prepare metadata
+        metadata = build_unit_metadata(page, unit, document_name)
+
+        # Print metadata for verification
+        print(f"Uploading with metadata preview: {json.dumps(metadata, indent=4)[:1000]}...")
+
+        # Store the text, then upload to Pinecone
+        store_unit_content([(page, unit)], document_name)
+        get_pinecone_index().upsert([(unit["id"], embedding, metadata)])
+        if unit["content_hash"]:
+            get_embedding_cache().mark_upserted({unit["id"]: unit["content_hash"]}, EMBEDDING_MODEL, INDEX_NAME)
+        index_unit_keywords([(page, unit)], document_name)
+        vector_ids.append(unit["id"])
+        print(f"Uploaded {unit['id']} (page {metadata['page_num']}) from {document_name} to Pinecone.")
+
+    return vector_ids
+
+def chunk_vectors_for_upsert(vectors, max_vectors: int = UPSERT_BATCH_SIZE, max_bytes: int = MAX_UPSERT_BYTES):
+    """
+    Split vectors into upsert requests bounded by vector count and approximate payload size.
+
+    Args:
+        vectors (list): (id, embedding, metadata) tuples.
+        max_vectors (int): Maximum number of vectors per request.
+        max_bytes (int): Approximate maximum request size in bytes.
 
-        for page in data:
-            text_content = page.get('contents', "No Text Available")
-            table_data = page.get('cells', [])
-            image_data = page.get('image', {}).get('bytes', None)
+    Returns:
+        list: Lists of vectors, one per upsert request.
+    """
+    chunks = []
+    current, current_bytes = [], 0
+    for vector in vectors:
+        vector_id, embedding, metadata = vector
+        # JSON encodes each float as roughly 20 characters
+        vector_bytes = len(vector_id) + len(embedding) * 20 + len(json.dumps(metadata))
+        if current and (len(current) >= max_vectors or current_bytes + vector_bytes > max_bytes):
+            chunks.append(current)
+            current, current_bytes = [], 0
+        current.append(vector)
+        current_bytes += vector_bytes
+    if current:
+        chunks.append(current)
+    return chunks
 
-            # Generate embedding for text content
-            embedding = generate_embedding(text_content)
+def _embed_and_upsert_batch(pages, document_name: str):
+    """
+    Embed the chunks of one batch of pages and upsert the resulting vectors.
 
-            # Serialize table data into a JSON string
-            table_json = json.dumps(table_data) if table_data else "No Table Data"
+    Chunks whose content_hash is already cached for this model reuse the cached embedding,
+    and chunks whose vector id already holds that content in this index are skipped entirely. The remaining texts
+    are embedded EMBED_BATCH_SIZE per request.
+    """
+    units = list(iter_index_units(pages, document_name))
+    stats = {
+        "pages": len(pages),
+        "vectors": len(units),
+        "embedding_requests": 0,
+        "upsert_requests": 0,
+        "cache_hits": 0,
+        "skipped_vectors": 0,
+        "vector_ids": [unit["id"] for _, unit in units],
+    }
 
-            # Prepare metadata
-            metadata = {
-                "document": document_name,
-                "page_num": page["extra"].get("page_num", "Unknown Page"),
-                "title": document_name,
-                "author": page.get("author", "Unknown Author"),
-                "text_preview": text_content[:1000] if isinstance(text_content, str) else "No Preview Available",
-                "table": table_json,
-            }
+    # Embeddings are reused by content hash; an upsert is skipped only when the same vector
+    # id already holds the same content, since one content hash can belong to several ids
+    # (e.g. the same PDF under two names)
+    upserted = get_embedding_cache().upserted_hashes(stats["vector_ids"], EMBEDDING_MODEL, INDEX_NAME)
+    cached = get_embedding_cache().get_many(
+        [unit["content_hash"] for _, unit in units if unit["content_hash"]], EMBEDDING_MODEL
+    )
+
+    to_upsert, to_embed = [], []
+    for page, unit in units:
+        if unit["content_hash"] and upserted.get(unit["id"]) == unit["content_hash"]:
+            stats["skipped_vectors"] += 1
+            continue
+        entry = cached.get(unit["content_hash"])
+        if entry is None:
+            to_embed.append((page, unit))
+            continue
+        stats["cache_hits"] += 1
+        to_upsert.append((page, unit, entry["embedding"]))
+
+    new_embeddings = {}
+    for start in range(0, len(to_embed), EMBED_BATCH_SIZE):
+        request = to_embed[start:start + EMBED_BATCH_SIZE]
+        embeddings = generate_embeddings([unit["text"] for _, unit in request])
+        stats["embedding_requests"] += 1
+        for (page, unit), embedding in zip(request, embeddings):
+            to_upsert.append((page, unit, embedding))
+            if unit["content_hash"]:
+                new_embeddings[unit["content_hash"]] = embedding
+
+    vectors = []
+    for page, unit, embedding in to_upsert:
+        vectors.append((unit["id"], embedding, build_unit_metadata(page, unit, document_name)))
+
+    # Content is stored before its vectors become searchable. Every chunk is written,
+    # including skipped ones, so the content store catches up with earlier upserts
+    store_unit_content(units, document_name)
+
+    for chunk in chunk_vectors_for_upsert(vectors):
+        get_pinecone_index().upsert(vectors=chunk)
+        stats["upsert_requests"] += 1
+
+    # Every chunk is (re)indexed, including skipped ones, so the keyword index catches up
+    # with vectors upserted before it existed
+    index_unit_keywords(units, document_name)
+
+    # Only record chunks as upserted once the upsert requests have succeeded
+    get_embedding_cache().put_many(new_embeddings, EMBEDDING_MODEL)
+    get_embedding_cache().mark_upserted(
+        {unit["id"]: unit["content_hash"] for _, unit, _ in to_upsert if unit["content_hash"]},
+        EMBEDDING_MODEL,
+        INDEX_NAME,
+    )
+    return stats
+
+def process_and_upload_to_pinecone_batched(
+    json_path: Path,
+    document_name: str,
+    batch_size: int = EMBED_BATCH_SIZE,
+    max_inflight: int = MAX_INFLIGHT_BATCHES,
+    artifact_format: str = None,
+    start_page: int = 0,
+    on_checkpoint=None,
+):
+    """
+    Stream a page artifact in page batches: one embedding request per batch, size-bounded
+    upserts, and several batches in flight at once.
+
+    Batches are collected in page order, so after on_checkpoint(batch_stats) is called
+    every page before that point has been upserted; passing the running page count back
+    as start_page resumes an interrupted document.
+
+    Args:
+        json_path (Path): Local path or open file object of the Docling page artifact.
+        document_name (str): Name of the document used in vector ids and metadata.
+        batch_size (int): Number of pages per embedding request.
+        max_inflight (int): Number of batches processed concurrently.
+        artifact_format (str): "parquet" or "json"; inferred from the file name when omitted.
+        start_page (int): Number of leading pages to skip because they were already upserted.
+        on_checkpoint (callable): Called with each completed batch's statistics, in order.
 
-            # Only include image data if available
-            if image_data:
-                metadata["image"] = "Image data available"
+    Returns:
+        dict: Throughput statistics for the document.
+    """
+    pages = iter_page_records(json_path, fields=PAGE_FIELDS, artifact_format=artifact_format)
+    pages = islice(pages, start_page, None)
+    batches = iter(lambda: list(islice(pages, batch_size)), [])
+    stats = {
+        "pages": 0, "vectors": 0, "embedding_requests": 0, "upsert_requests": 0, "cache_hits": 0,
+        "skipped_vectors": 0, "vector_ids": [],
+    }
 
-            # Print metadata for verification
-            print(f"Uploading with metadata preview: {json.dumps(metadata, indent=4)[:1000]}...")
+    def collect(future):
+        batch_stats = future.result()
+        for key, value in batch_stats.items():
+            stats[key] += value
+        if on_checkpoint is not None:
+            on_checkpoint(batch_stats)
 
-            # Upload to Pinecone
-            index.upsert([(f"{document_name}_{metadata['page_num']}", embedding, metadata)])
-            print(f"Uploaded page {metadata['page_num']} from {document_name} to Pinecone.")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_inflight) as executor:
+        # Pages are read lazily, so at most max_inflight batches are held in memory at once
+        inflight = deque()
+        for batch in batches:
+            if len(inflight) >= max_inflight:
+                collect(inflight.popleft())
+            inflight.append(executor.submit(_embed_and_upsert_batch, batch, document_name))
+        while inflight:
+            collect(inflight.popleft())
+    stats["seconds"] = time.perf_counter() - start
 
-def main():
-    """Main function to process all JSON files from S3 folder."""
-    # List all JSON files in the S3 folder
-    json_files = list_json_files_in_s3(S3_BUCKET_NAME, S3_FOLDER_PATH)
-    print(f"Found JSON files: {json_files}")
+    print(
+        f"Uploaded {stats['vectors'] - stats['skipped_vectors']} vectors for {stats['pages']} pages of "
+        f"{document_name} to Pinecone ({stats['skipped_vectors']} unchanged vectors skipped)."
+    )
+    return stats
+
+def delete_vectors(vector_ids, batch_size: int = 1000):
+    """Delete vectors from Pinecone in batches, and their text from the keyword index and content store."""
+    vector_ids = list(vector_ids)
+    for start in range(0, len(vector_ids), batch_size):
+        get_pinecone_index().delete(ids=vector_ids[start:start + batch_size])
+    get_keyword_index().delete(vector_ids)
+    get_content_store().delete(vector_ids)
+    # Re-adding the same content under these ids must upsert it again
+    get_embedding_cache().forget_upserted(vector_ids, INDEX_NAME)
 
-    # Temporary local directory for downloading JSON files
-    temp_dir = Path("./temp_json_files")
-    temp_dir.mkdir(exist_ok=True)
+def ingest_manifest_record(record: dict, manifest: IngestionManifest, batched: bool = True):
+    """
+    Upsert a converted document described by a manifest record, resuming from its checkpoint.
 
-    for s3_key in json_files:
-        # Extract document name from S3 key
-        document_name = Path(s3_key).stem.replace("_", " ")
+    Progress is saved to the manifest after every completed page batch. Once the document
+    is fully upserted, vectors left over from a previous version are deleted.
 
-        # Define local path for download
-        local_path = temp_dir / f"{document_name}.json"
+    Returns:
+        dict: Throughput statistics for the document.
+    """
+    s3_key = record["artifact_key"]
+    document_name = Path(s3_key).stem.replace("_", " ")
+    artifact_format = artifact_format_for(s3_key)
+    if record["upserted_pages"] == 0:
+        record["vector_ids"] = []
+    elif not batched:
+        # The per-page path has no checkpoints; start the document over
+        record["upserted_pages"], record["vector_ids"] = 0, []
+    else:
+        print(f"Resuming {document_name} after {record['upserted_pages']} upserted pages.")
 
-        # Download JSON file from S3
-        download_json_from_s3(S3_BUCKET_NAME, s3_key, local_path)
+    def checkpoint(batch_stats):
+        record["upserted_pages"] += batch_stats["pages"]
+        record["vector_ids"].extend(batch_stats["vector_ids"])
+        manifest.put(record)
 
+    # Stream the artifact straight from S3 into the reader
+    with open_artifact_from_s3(S3_BUCKET_NAME, s3_key) as artifact:
         # Process and upload to Pinecone
-        process_and_upload_to_pinecone(local_path, document_name)
+        if batched:
+            stats = process_and_upload_to_pinecone_batched(
+                artifact,
+                document_name,
+                artifact_format=artifact_format,
+                start_page=record["upserted_pages"],
+                on_checkpoint=checkpoint,
+            )
+        else:
+            record["vector_ids"] = process_and_upload_to_pinecone(artifact, document_name, artifact_format=artifact_format)
+            stats = None
+
+    stale_ids = set(record["stale_vector_ids"]) - set(record["vector_ids"])
+    if stale_ids:
+        delete_vectors(stale_ids)
+        print(f"Deleted {len(stale_ids)} vectors no longer present in {document_name}.")
+    record["stale_vector_ids"] = []
+    record["upsert_status"] = DONE
+    record["document_name"] = document_name
+    record["page_count"] = record["upserted_pages"]
+    record["ingested_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    manifest.put(record)
+    return stats
+
+def prune_deleted_documents(manifest: IngestionManifest, records, source_keys):
+    """
+    Remove vectors, artifacts and manifest records of documents whose source PDF is gone.
 
-        # Optionally delete the local file to save space
-        local_path.unlink()
+    Returns:
+        list: The records that remain.
+    """
+    remaining = []
+    for record in records:
+        if record["source_key"] in source_keys:
+            remaining.append(record)
+            continue
+        delete_vectors(set(record.get("vector_ids", [])) | set(record.get("stale_vector_ids", [])))
+        if record.get("artifact_key"):
+            s3_client.delete_object(Bucket=S3_BUCKET_NAME, Key=record["artifact_key"])
+        manifest.delete(record["source_key"])
+        print(f"Removed deleted document {record['source_key']} from the index.")
+    return remaining
+
+def ingest_source_document(source_key: str, batched: bool = True):
+    """
+    Upsert one converted source document if its manifest says it is pending.
+
+    Used by the Airflow DAG's per-document tasks.
+
+    Returns:
+        dict: Throughput statistics without vector ids (small enough for XCom), or None
+        if there was nothing to do.
+    """
+    manifest = IngestionManifest(S3_BUCKET_NAME, s3_client=s3_client)
+    record = manifest.get(source_key)
+    if not record or record["conversion_status"] != DONE or record["upsert_status"] == DONE:
+        print(f"Nothing to upsert for {source_key}.")
+        return None
+    stats = ingest_manifest_record(record, manifest, batched=batched)
+    if stats:
+        stats.pop("vector_ids", None)
+    return stats
+
+def prune_deleted_sources():
+    """Remove documents whose source PDF is gone and return the remaining manifest records."""
+    manifest = IngestionManifest(S3_BUCKET_NAME, s3_client=s3_client)
+    source_keys = set(s3_io.list_keys(S3_BUCKET_NAME, S3_SOURCE_FOLDER, suffixes=('.pdf',), s3_client=s3_client))
+    return prune_deleted_documents(manifest, list(manifest.records()), source_keys)
+
+def update_document_catalog(records=None):
+    """
+    Rebuild the document catalog from the ingestion manifest.
+
+    Run once after a batch of documents has been ingested (a single writer), so the
+    API can list documents without scanning the index.
+    """
+    if records is None:
+        records = IngestionManifest(S3_BUCKET_NAME, s3_client=s3_client).records()
+    entries = [catalog_entry_from_record(record) for record in records if record["upsert_status"] == DONE]
+    DocumentCatalog(S3_BUCKET_NAME, s3_client=s3_client).save(entries)
+    return len(entries)
+
+def rebuild_keyword_index(records=None):
+    """Write the chunks of every fully upserted document to the keyword index and content store (backfill)."""
+    if records is None:
+        records = IngestionManifest(S3_BUCKET_NAME, s3_client=s3_client).records()
+    pages_indexed = 0
+    for record in records:
+        if record["upsert_status"] != DONE:
+            continue
+        fields = ["page_hash", "contents", "cells", "segments", "page_num"]
+        with open_artifact_from_s3(S3_BUCKET_NAME, record["artifact_key"]) as artifact:
+            pages = iter_page_records(artifact, fields=fields, artifact_format=artifact_format_for(record["artifact_key"]))
+            while True:
+                batch = list(islice(pages, EMBED_BATCH_SIZE))
+                if not batch:
+                    break
+                units = list(iter_index_units(batch, record["document_name"]))
+                store_unit_content(units, record["document_name"])
+                index_unit_keywords(units, record["document_name"])
+                pages_indexed += len(batch)
+    print(f"Indexed {pages_indexed} pages in the keyword index and content store.")
+    return pages_indexed
+
+def print_throughput_report(stats: dict):
+    """Print pages/sec and request counts for an ingestion run."""
+    pages_per_sec = stats["pages"] / stats["seconds"] if stats["seconds"] else 0.0
+    print("Ingestion throughput report:")
+    print(f"  Pages processed:     {stats['pages']}")
+    print(f"  Vectors (chunks):    {stats.get('vectors', 0)}")
+    print(f"  Elapsed seconds:     {stats['seconds']:.2f}")
+    print(f"  Pages/sec:           {pages_per_sec:.2f}")
+    print(f"  Embedding requests:  {stats['embedding_requests']}")
+    print(f"  Upsert requests:     {stats['upsert_requests']}")
+    print(f"  Total requests:      {stats['embedding_requests'] + stats['upsert_requests']}")
+    print(f"  Embedding cache hits: {stats.get('cache_hits', 0)}")
+    print(f"  Unchanged vectors skipped: {stats.get('skipped_vectors', 0)}")
+
+def main(batched: bool = True):
+    """Main function to upsert every converted document that is not yet in Pinecone."""
+    manifest = IngestionManifest(S3_BUCKET_NAME, s3_client=s3_client)
+
+    # Drop documents whose source PDF has been deleted
+    records = prune_deleted_sources()
+
+    # Only converted documents whose upsert has not completed need work
+    pending = [
+        record for record in records
+        if record["conversion_status"] == DONE and record["upsert_status"] != DONE
+    ]
+    print(f"Found {len(pending)} documents to upsert out of {len(records)}.")
+
+    run_stats = {"pages": 0, "vectors": 0, "embedding_requests": 0, "upsert_requests": 0, "cache_hits": 0, "skipped_vectors": 0}
+    run_start = time.perf_counter()
+
+    for record in pending:
+        doc_stats = ingest_manifest_record(record, manifest, batched=batched)
+        if doc_stats:
+            for key in run_stats:
+                run_stats[key] += doc_stats[key]
+
+    update_document_catalog()
+
+    if batched:
+        run_stats["seconds"] = time.perf_counter() - run_start
+        print_throughput_report(run_stats)
 
 if __name__ == "__main__":
-    main()
+    import sys
+
+    # `python s3_pinecone.py rebuild-keyword-index` backfills the keyword index and content
+    # store from the artifacts of every upserted document, without re-embedding
+    if sys.argv[1:] == ["rebuild-keyword-index"]:
+        rebuild_keyword_index()
+    else:
+        main()
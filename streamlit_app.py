@@ -1,3 +1,4 @@
+import json
 import streamlit as st
 import requests
 import pandas as pd
@@ -44,6 +45,20 @@ if "documents" in st.session_state:
         )
         st.write("Selected Document:", select_response.json())
 
+def iter_sse_events(response):
+    """Yield (event, data) pairs from a server-sent events response as lines arrive."""
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line:
+            field, _, value = line.partition(":")
+            if field == "event":
+                event = value.strip()
+            elif field == "data":
+                data_lines.append(value[1:] if value.startswith(" ") else value)
+        elif data_lines:
+            yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+
 # RAG Query
 st.header("RAG Query")
 rag_question = st.text_input("Enter a question for RAG query")
@@ -52,20 +67,38 @@ if st.button("Get Answer"):
     if not selected_document_name:
         st.write("Please select a document first.")
     elif rag_question:
-        # Make the RAG query
-        response = requests.post(f"{BASE_URL}/rag_query", json={"question": rag_question})
-        if response.status_code == 200:
-            answer = response.json().get("answer", "No answer found")
-            st.write("RAG Answer:", answer)
-
-            # Save the interaction to the session state history
-            st.session_state.interaction_history.append({
-                "Document Name": selected_document_name,
-                "Question": rag_question,
-                "Answer": answer
-            })
-        else:
-            st.write("Failed to get answer.")
+        # Stream the RAG answer: sources arrive first, then answer tokens as they are generated
+        answer = ""
+        with requests.post(
+            f"{BASE_URL}/rag_query/stream",
+            json={"question": rag_question, "documents": [selected_document_name]},
+            stream=True,
+            timeout=60,
+        ) as response:
+            if response.status_code == 200:
+                sources_placeholder = st.empty()
+                st.write("RAG Answer:")
+                answer_placeholder = st.empty()
+                for event, data in iter_sse_events(response):
+                    if event == "sources":
+                        sources_placeholder.markdown("**Sources:** " + ", ".join(
+                            f"{source['document']} (p. {source['page_num']})" for source in data
+                        ))
+                    elif event == "token":
+                        answer += data
+                        answer_placeholder.markdown(answer + "▌")
+                    elif event == "error":
+                        answer = data
+                answer_placeholder.markdown(answer or "No answer found")
+
+                # Save the interaction to the session state history
+                st.session_state.interaction_history.append({
+                    "Document Name": selected_document_name,
+                    "Question": rag_question,
+                    "Answer": answer
+                })
+            else:
+                st.write("Failed to get answer.")
     else:
         st.write("Please enter a question for RAG.")
 
@@ -0,0 +1,73 @@
+import numpy as np
+
+from context_packing import mmr_select, pack_context
+
+DIMENSION = 32
+
+
+def related_vectors(count, cosine=0.8, seed=0):
+    """Unit vectors whose pairwise cosine similarity is `cosine`."""
+    rng = np.random.default_rng(seed)
+    basis, _ = np.linalg.qr(rng.normal(size=(DIMENSION, count + 1)))
+    shared, own = basis[:, 0], basis[:, 1:].T
+    return np.sqrt(cosine) * shared + np.sqrt(1 - cosine) * own
+
+
+def candidates_with_scores(scores, vectors):
+    return [
+        {"id": f"doc_{i}", "score": score, "values": vector.tolist(), "content": f"distinct chunk {i}"}
+        for i, (score, vector) in enumerate(zip(scores, vectors))
+    ]
+
+
+def format_item(item):
+    return item["content"]
+
+
+def test_single_standout_hit_keeps_top_k_distinct_candidates():
+    vectors = related_vectors(15)
+    candidates = candidates_with_scores([0.90] + [0.82 - 0.001 * i for i in range(14)], vectors)
+
+    context, report = pack_context(candidates, vectors[0], top_k=5, format_item=format_item)
+
+    assert len(context) == 5
+    assert context[0]["id"] == "doc_0"
+    assert report["selected"] == 5
+    assert report["tokens_saved"] == 0
+    assert all("values" not in item for item in context)
+
+
+def test_near_duplicates_are_dropped():
+    vectors = related_vectors(4)
+    duplicate = vectors[0] + 0.01 * vectors[1]
+    candidates = candidates_with_scores([0.9, 0.89, 0.8, 0.7, 0.6], [vectors[0], duplicate, *vectors[1:]])
+
+    picks = mmr_select(candidates, vectors[0], k=5)
+
+    assert picks[0] == 0
+    assert 1 not in picks
+    assert len(picks) == 4
+
+
+def test_identical_content_without_vectors_is_a_duplicate():
+    candidates = [
+        {"id": "a", "score": 0.9, "content": "same text"},
+        {"id": "b", "score": 0.8, "content": "same  text"},
+        {"id": "c", "score": 0.7, "content": "other text"},
+    ]
+
+    context, report = pack_context(candidates, [0.0] * DIMENSION, top_k=3, format_item=format_item)
+
+    assert [item["id"] for item in context] == ["a", "c"]
+    assert report["tokens_saved"] > 0
+
+
+def test_token_budget_skips_items_that_do_not_fit():
+    vectors = related_vectors(3)
+    candidates = candidates_with_scores([0.9, 0.8, 0.7], vectors)
+    candidates[1]["content"] = "long " * 100
+
+    context, report = pack_context(candidates, vectors[0], top_k=3, format_item=format_item, token_budget=20)
+
+    assert [item["id"] for item in context] == ["doc_0", "doc_2"]
+    assert report["packed_tokens"] <= 20
@@ -0,0 +1,119 @@
+"""Ingest page artifacts from a moto S3 bucket into a LocalVectorIndex and retrieve them.
+
+OpenAI is never called: embeddings are derived deterministically from the chunk text.
+"""
+
+import hashlib
+
+import numpy as np
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("pinecone")
+moto = pytest.importorskip("moto")
+
+import boto3
+
+import content_store
+import keyword_index
+import rag_agent
+import s3_pinecone
+from embedding_cache import EmbeddingCache
+from ingestion_manifest import DONE, IngestionManifest, new_record
+from local_vector_index import LocalVectorIndex
+from page_artifacts import write_page_artifact
+
+DIMENSION = 16
+PAGES = 5
+
+
+def fake_embedding(text):
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).normal(size=DIMENSION).tolist()
+
+
+def page_rows():
+    """Rows of one converted PDF; both copies share its Docling hashes."""
+    return [
+        {
+            "document": "report.pdf",
+            "hash": "document-hash",
+            "page_hash": f"page-hash-{i}",
+            "contents": f"Page {i} discusses capital market liquidity in region{i}.",
+            "cells": [],
+            "segments": [{"label": "text", "text": f"Page {i} discusses capital market liquidity in region{i}."}],
+            "extra": {"page_num": i + 1},
+        }
+        for i in range(PAGES)
+    ]
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_aws():
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket=s3_pinecone.S3_BUCKET_NAME)
+        index = LocalVectorIndex(tmp_path / "vectors", dimension=DIMENSION)
+
+        monkeypatch.setattr(s3_pinecone, "s3_client", s3_client)
+        monkeypatch.setattr(s3_pinecone, "_index", index)
+        monkeypatch.setattr(s3_pinecone, "_embedding_cache", EmbeddingCache(tmp_path / "embeddings.sqlite3"))
+        monkeypatch.setattr(keyword_index, "_default_index", keyword_index.KeywordIndex(tmp_path / "keywords.sqlite3"))
+        monkeypatch.setattr(content_store, "_default_store", content_store.ContentStore(tmp_path / "content.sqlite3"))
+        monkeypatch.setattr(s3_pinecone, "generate_embeddings", lambda texts: [fake_embedding(t) for t in texts])
+
+        manifest = IngestionManifest(s3_pinecone.S3_BUCKET_NAME, s3_client=s3_client)
+        yield s3_client, manifest, index
+        index.close()
+
+
+def ingest(s3_client, manifest, tmp_path, stem):
+    """Upload an artifact for `stem` and run the batched upsert of its manifest record."""
+    artifact = write_page_artifact(page_rows(), tmp_path / f"{stem}.parquet")
+    artifact_key = f"{s3_pinecone.S3_FOLDER_PATH}{stem}.parquet"
+    s3_client.upload_file(str(artifact), s3_pinecone.S3_BUCKET_NAME, artifact_key)
+    record = new_record(f"{s3_pinecone.S3_SOURCE_FOLDER}{stem}.pdf", "etag")
+    record.update(artifact_key=artifact_key, conversion_status=DONE)
+    manifest.put(record)
+    return s3_pinecone.ingest_manifest_record(record, manifest)
+
+
+def test_ingest_then_retrieve(pipeline, tmp_path):
+    s3_client, manifest, index = pipeline
+
+    stats = ingest(s3_client, manifest, tmp_path, "Report_A")
+    assert stats["pages"] == PAGES
+    assert index.describe_index_stats()["total_vector_count"] == stats["vectors"]
+
+    text = "Page 2 discusses capital market liquidity in region2."
+    context = rag_agent.retrieve_context(index, fake_embedding(text), top_k=3, keyword_query="region2 liquidity")
+    assert context[0]["document"] == "Report A"
+    assert context[0]["page_num"] == 3
+    # Content is hydrated from the content store
+    assert context[0]["content"] == text
+    assert manifest.get("input_pdfs/Report_A.pdf")["upsert_status"] == DONE
+
+
+def test_same_pdf_under_two_names_gets_vectors_for_both(pipeline, tmp_path):
+    s3_client, manifest, index = pipeline
+
+    first = ingest(s3_client, manifest, tmp_path, "Report_A")
+    second = ingest(s3_client, manifest, tmp_path, "Report_Copy")
+
+    # Embeddings are reused, but every vector id of the copy is still written
+    assert second["embedding_requests"] == 0
+    assert second["skipped_vectors"] == 0
+    assert index.describe_index_stats()["total_vector_count"] == first["vectors"] + second["vectors"]
+
+    text = "Page 0 discusses capital market liquidity in region0."
+    context = rag_agent.retrieve_context(index, fake_embedding(text), top_k=2, documents=["Report Copy"])
+    assert [item["document"] for item in context] == ["Report Copy", "Report Copy"]
+    assert context[0]["content"] == text
+
+    # Re-ingesting unchanged content skips every upsert
+    again = ingest(s3_client, manifest, tmp_path, "Report_Copy")
+    assert again["skipped_vectors"] == again["vectors"]
+    assert again["upsert_requests"] == 0
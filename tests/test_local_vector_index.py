@@ -0,0 +1,166 @@
+import threading
+
+import numpy as np
+import pytest
+
+import vector_quantization
+from local_vector_index import PQ_MIN_TRAINING_VECTORS, LocalVectorIndex
+
+DIMENSION = 16
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(40, DIMENSION)).astype(np.float32)
+
+
+@pytest.fixture
+def index(tmp_path, vectors):
+    index = LocalVectorIndex(tmp_path / "index", dimension=DIMENSION)
+    index.upsert([
+        (f"v{i}", vectors[i], {"document": "A" if i % 2 else "B", "page_num": i})
+        for i in range(len(vectors))
+    ])
+    yield index
+    index.close()
+
+
+def match_ids(response):
+    return [match["id"] for match in response["matches"]]
+
+
+def test_query_returns_nearest_vectors_with_metadata(index, vectors):
+    response = index.query(vector=vectors[7], top_k=3, include_metadata=True, include_values=True)
+
+    assert response["matches"][0]["id"] == "v7"
+    assert response["matches"][0]["score"] == pytest.approx(1.0, abs=1e-5)
+    assert response["matches"][0]["metadata"] == {"document": "A", "page_num": 7}
+    np.testing.assert_allclose(response["matches"][0]["values"], vectors[7], rtol=1e-6)
+    assert len(response["matches"]) == 3
+
+
+def test_upsert_replaces_existing_ids(index, vectors):
+    index.upsert([("v7", vectors[8], {"document": "C", "page_num": 7})])
+
+    assert index.describe_index_stats()["total_vector_count"] == len(vectors)
+    assert index.fetch(["v7"])["vectors"]["v7"]["metadata"]["document"] == "C"
+    assert set(match_ids(index.query(vector=vectors[8], top_k=2))) == {"v7", "v8"}
+
+
+def test_filtered_query_only_returns_matching_vectors(index, vectors):
+    response = index.query(vector=vectors[7], top_k=5, filter={"document": "B"}, include_metadata=True)
+    assert "v7" not in match_ids(response)
+    assert {match["metadata"]["document"] for match in response["matches"]} == {"B"}
+
+    response = index.query(vector=vectors[7], top_k=40, filter={"document": {"$in": ["A"]}, "page_num": {"$lt": 10}})
+    assert sorted(match_ids(response)) == ["v1", "v3", "v5", "v7", "v9"]
+
+    assert index.query(vector=vectors[7], top_k=5, filter={"document": "missing"})["matches"] == []
+
+
+def test_namespaces_are_searched_separately(index, vectors):
+    index.upsert([("v7", vectors[7], {"document": "A"})], namespace="other")
+
+    assert match_ids(index.query(vector=vectors[7], top_k=40, namespace="other")) == ["v7"]
+    assert index.describe_index_stats()["namespaces"]["other"] == {"vector_count": 1}
+
+
+def test_delete_compacts_slots_and_persists(tmp_path, index, vectors):
+    deleted = {f"v{i}" for i in (0, 5, 6, 39)}
+    index.delete(ids=sorted(deleted))
+
+    assert index.describe_index_stats()["total_vector_count"] == len(vectors) - len(deleted)
+    assert index.fetch(sorted(deleted))["vectors"] == {}
+    for i in range(len(vectors)):
+        if f"v{i}" in deleted:
+            continue
+        # Vectors moved into the freed slots keep their values and metadata
+        fetched = index.fetch([f"v{i}"])["vectors"][f"v{i}"]
+        np.testing.assert_allclose(fetched["values"], vectors[i], rtol=1e-6)
+        assert fetched["metadata"]["page_num"] == i
+        assert match_ids(index.query(vector=vectors[i], top_k=1)) == [f"v{i}"]
+
+    index.delete(filter={"document": "B"})
+    assert {match["id"] for match in index.query(vector=vectors[1], top_k=40)["matches"]} == {
+        f"v{i}" for i in range(1, 40, 2) if f"v{i}" not in deleted
+    }
+
+    reopened = LocalVectorIndex(tmp_path / "index", dimension=DIMENSION)
+    try:
+        assert reopened.describe_index_stats()["total_vector_count"] == 18
+        assert match_ids(reopened.query(vector=vectors[9], top_k=1)) == ["v9"]
+    finally:
+        reopened.close()
+
+
+@pytest.mark.parametrize("quantization", ["float16", "int8"])
+def test_quantized_search_reranks_exactly(tmp_path, vectors, quantization):
+    index = LocalVectorIndex(tmp_path / "quantized", dimension=DIMENSION, quantization=quantization)
+    try:
+        index.upsert([(f"v{i}", vectors[i]) for i in range(len(vectors))])
+        response = index.query(vector=vectors[3], top_k=3)
+        assert response["matches"][0]["id"] == "v3"
+        assert response["matches"][0]["score"] == pytest.approx(1.0, abs=1e-5)
+    finally:
+        index.close()
+
+
+def test_writers_in_two_instances_do_not_claim_the_same_slot(tmp_path, vectors):
+    first = LocalVectorIndex(tmp_path / "shared", dimension=DIMENSION)
+    second = LocalVectorIndex(tmp_path / "shared", dimension=DIMENSION)
+    sync = second._sync
+    writer = threading.Thread(target=lambda: first.upsert([("x0", vectors[0])]))
+
+    def racing_sync():
+        # The other instance writes after this one has reloaded but before it commits
+        sync()
+        if writer.ident is None:
+            writer.start()
+            writer.join(timeout=0.5)
+
+    second._sync = racing_sync
+    try:
+        second.upsert([("y0", vectors[1])])
+        writer.join()
+        second._sync = sync
+
+        for index in (first, second):
+            assert index.describe_index_stats()["total_vector_count"] == 2
+            assert match_ids(index.query(vector=vectors[0], top_k=1)) == ["x0"]
+            assert match_ids(index.query(vector=vectors[1], top_k=1)) == ["y0"]
+    finally:
+        first.close()
+        second.close()
+
+
+def test_product_quantization_is_trained_once_and_shared(tmp_path, monkeypatch):
+    dimension = vector_quantization.PQ_SUBVECTORS
+    rng = np.random.default_rng(1)
+    stored = rng.normal(size=(PQ_MIN_TRAINING_VECTORS + 1, dimension)).astype(np.float32)
+    writer = LocalVectorIndex(tmp_path / "pq", dimension=dimension, quantization="pq")
+    writer.upsert([(f"v{i}", stored[i]) for i in range(len(stored))])
+    assert writer._quantizer.trained
+
+    encoded = []
+    set_codes = vector_quantization.CompressedMatrix.set
+    monkeypatch.setattr(vector_quantization.CompressedMatrix, "set",
+                        lambda self, slots, rows: (encoded.append(len(slots)), set_codes(self, slots, rows)))
+    monkeypatch.setattr(vector_quantization.ProductQuantizer, "fit", lambda self, vectors: pytest.fail("retrained"))
+    # Another process loads the saved codebooks and codes instead of training and encoding
+    reader = LocalVectorIndex(tmp_path / "pq", dimension=dimension, quantization="pq")
+    plain_writer = LocalVectorIndex(tmp_path / "pq", dimension=dimension, quantization=None)
+    try:
+        # Product quantization defaults to a longer exact re-ranking shortlist
+        assert reader.rerank_factor == 10
+        assert match_ids(reader.query(vector=stored[5], top_k=1)) == ["v5"]
+        assert encoded == []
+
+        # Rows written without quantization are the only ones re-encoded
+        extra = rng.normal(size=dimension).astype(np.float32)
+        plain_writer.upsert([("extra", extra)])
+        assert match_ids(reader.query(vector=extra, top_k=1)) == ["extra"]
+        assert encoded == [1]
+    finally:
+        for index in (writer, reader, plain_writer):
+            index.close()
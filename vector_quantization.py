@@ -0,0 +1,244 @@
+import logging
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Configuration
+SCORE_BLOCK_ROWS = 512  # Compressed rows decoded at a time while scoring (stays in CPU cache)
+PQ_SUBVECTORS = 96  # Product quantization: 1536-dim Ada vectors split into 16-dim subvectors
+PQ_CENTROIDS = 256  # One byte per subvector code
+PQ_TRAIN_SAMPLE = 20000  # Vectors sampled to train the codebooks
+PQ_TRAIN_ITERATIONS = 15
+
+_log = logging.getLogger(__name__)
+
+
+class Float16Quantizer:
+    """Stores each component as float16 (2 bytes instead of 4)."""
+
+    name = "float16"
+    trained = True
+
+    def code_layout(self, dimension: int) -> Tuple[int, np.dtype]:
+        return dimension, np.float16
+
+    def fit(self, vectors: np.ndarray):
+        return self
+
+    def save(self, path: Path):
+        pass
+
+    def load(self, path: Path):
+        pass
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+
+    def scores(self, codes: np.ndarray, scales: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) @ queries.T
+
+
+class Int8Quantizer:
+    """Symmetric scalar quantization with one float32 scale per vector (1 byte per component)."""
+
+    name = "int8"
+    trained = True
+
+    def code_layout(self, dimension: int) -> Tuple[int, np.dtype]:
+        return dimension, np.int8
+
+    def fit(self, vectors: np.ndarray):
+        return self
+
+    def save(self, path: Path):
+        pass
+
+    def load(self, path: Path):
+        pass
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def scores(self, codes: np.ndarray, scales: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        return (codes.astype(np.float32) @ queries.T) * scales[:, None]
+
+
+class ProductQuantizer:
+    """
+    Product quantization: each vector is split into `subvectors` parts and every part is
+    replaced by the index of its nearest centroid (1 byte each). Inner products are
+    computed from per-query lookup tables without decoding the vectors.
+    """
+
+    name = "pq"
+
+    def __init__(self, subvectors: int = PQ_SUBVECTORS, centroids: int = PQ_CENTROIDS,
+                 train_sample: int = PQ_TRAIN_SAMPLE, iterations: int = PQ_TRAIN_ITERATIONS, seed: int = 0):
+        self.subvectors = subvectors
+        self.centroids = centroids
+        self.train_sample = train_sample
+        self.iterations = iterations
+        self.seed = seed
+        self.codebooks = None  # (subvectors, centroids, subvector dimension)
+
+    @property
+    def trained(self) -> bool:
+        return self.codebooks is not None
+
+    def code_layout(self, dimension: int) -> Tuple[int, np.dtype]:
+        if dimension % self.subvectors:
+            raise ValueError(f"Dimension {dimension} is not divisible into {self.subvectors} subvectors")
+        return self.subvectors, np.uint8
+
+    def fit(self, vectors: np.ndarray):
+        """Train one k-means codebook per subvector on a sample of `vectors`."""
+        rng = np.random.default_rng(self.seed)
+        if len(vectors) > self.train_sample:
+            vectors = vectors[rng.choice(len(vectors), self.train_sample, replace=False)]
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.code_layout(vectors.shape[1])
+        parts = vectors.reshape(len(vectors), self.subvectors, -1)
+        k = min(self.centroids, len(vectors))
+        codebooks = np.zeros((self.subvectors, self.centroids, parts.shape[2]), dtype=np.float32)
+        for j in range(self.subvectors):
+            codebooks[j, :k] = self._kmeans(parts[:, j], k, rng)
+        self.codebooks = codebooks
+        _log.info(f"Trained product quantizer on {len(vectors)} vectors")
+        return self
+
+    def save(self, path: Path):
+        """Write the codebooks to `path` (an .npy file), replacing it atomically."""
+        temporary = Path(path).with_name(Path(path).name + ".tmp")
+        with open(temporary, "wb") as f:
+            np.save(f, self.codebooks)
+        os.replace(temporary, path)
+
+    def load(self, path: Path):
+        """Read codebooks saved by save(); the quantizer stays untrained if there are none."""
+        if Path(path).exists():
+            codebooks = np.load(path)
+            if codebooks.shape[:2] != (self.subvectors, self.centroids):
+                raise ValueError(f"{path} holds {codebooks.shape[0]}x{codebooks.shape[1]} codebooks, "
+                                 f"not {self.subvectors}x{self.centroids}")
+            self.codebooks = codebooks
+
+    def _kmeans(self, points: np.ndarray, k: int, rng) -> np.ndarray:
+        centers = points[rng.choice(len(points), k, replace=False)].copy()
+        for _ in range(self.iterations):
+            assignment = self._nearest(points, centers)
+            counts = np.bincount(assignment, minlength=k)
+            sums = np.zeros_like(centers)
+            np.add.at(sums, assignment, points)
+            empty = counts == 0
+            centers[~empty] = sums[~empty] / counts[~empty, None]
+            # Restart empty clusters from random points
+            centers[empty] = points[rng.choice(len(points), int(empty.sum()))]
+        return centers
+
+    @staticmethod
+    def _nearest(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+        distances = (centers ** 2).sum(axis=1)[None, :] - 2 * points @ centers.T
+        return distances.argmin(axis=1)
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        parts = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), self.subvectors, -1)
+        codes = np.empty((len(vectors), self.subvectors), dtype=np.uint8)
+        for j in range(self.subvectors):
+            codes[:, j] = self._nearest(parts[:, j], self.codebooks[j])
+        return codes, np.ones(len(vectors), dtype=np.float32)
+
+    def scores(self, codes: np.ndarray, scales: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        scores = np.empty((len(codes), len(queries)), dtype=np.float32)
+        columns = np.arange(self.subvectors)
+        for i, query in enumerate(queries):
+            # (subvectors, centroids) table of partial inner products with this query
+            table = np.einsum("jcd,jd->jc", self.codebooks, query.reshape(self.subvectors, -1))
+            scores[:, i] = table[columns, codes].sum(axis=1)
+        return scores
+
+
+QUANTIZERS = {"float16": Float16Quantizer, "int8": Int8Quantizer, "pq": ProductQuantizer}
+
+
+def get_quantizer(name: str):
+    """Return a new quantizer by name ("float16", "int8" or "pq")."""
+    try:
+        return QUANTIZERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown quantization {name!r}; use one of {sorted(QUANTIZERS)}") from None
+
+
+class CompressedMatrix:
+    """
+    Growable matrix of quantized vectors, scored approximately in blocks so only
+    SCORE_BLOCK_ROWS rows are ever decoded to float32 at once.
+
+    With `directory` set, codes and scales are memory-mapped from files named after the
+    quantizer, so they persist and are shared by every process opening the directory.
+    """
+
+    def __init__(self, quantizer, dimension: int, capacity: int, directory: Optional[Path] = None):
+        self.quantizer = quantizer
+        self.dimension = dimension
+        self.width, self.dtype = quantizer.code_layout(dimension)
+        self._files = None
+        if directory is not None:
+            directory = Path(directory)
+            self._files = (directory / f"{quantizer.name}.codes", directory / f"{quantizer.name}.scales")
+        self.codes = np.zeros((0, self.width), dtype=self.dtype)
+        self.scales = np.ones(0, dtype=np.float32)
+        self.resize(capacity)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scales.nbytes
+
+    def resize(self, capacity: int):
+        if self._files is None:
+            codes = np.zeros((capacity, self.width), dtype=self.dtype)
+            scales = np.ones(capacity, dtype=np.float32)
+            rows = min(capacity, len(self.codes))
+            codes[:rows], scales[:rows] = self.codes[:rows], self.scales[:rows]
+            self.codes, self.scales = codes, scales
+            return
+        self.flush()
+        codes_path, scales_path = self._files
+        self.codes = self._map(codes_path, self.dtype, (capacity, self.width))
+        self.scales = self._map(scales_path, np.float32, (capacity,))
+
+    @staticmethod
+    def _map(path: Path, dtype, shape) -> np.memmap:
+        """Map `path` with the given shape, growing the file if needed."""
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        with open(path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def flush(self):
+        if isinstance(self.codes, np.memmap):
+            self.codes.flush()
+            self.scales.flush()
+
+    def set(self, slots, vectors: np.ndarray):
+        """Encode `vectors` into the given slots."""
+        if len(slots):
+            self.codes[slots], self.scales[slots] = self.quantizer.encode(np.asarray(vectors, dtype=np.float32))
+
+    def scores(self, queries: np.ndarray, count: int, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Return approximate (len(queries), n) scores against the first `count` slots, or
+        against the given slot `rows`.
+        """
+        n = count if rows is None else len(rows)
+        scores = np.empty((n, len(queries)), dtype=np.float32)
+        for start in range(0, n, SCORE_BLOCK_ROWS):
+            block = slice(start, min(start + SCORE_BLOCK_ROWS, n))
+            slots = block if rows is None else rows[block]
+            scores[block] = self.quantizer.scores(self.codes[slots], self.scales[slots], queries)
+        return scores.T
@@ -1,29 +1,53 @@
 import requests
 import serpapi
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlparse
 # from serpapi import GoogleSearch
 from serpapi.google_search import GoogleSearch
-from bs4 import BeautifulSoup
 from typing import List, Dict
+from fetch_cache import get_fetch_cache
+
+# Page fetching configuration
+FETCH_TIMEOUT = 10  # Seconds allowed for a single page request
+FETCH_DEADLINE = 8  # Seconds allowed for fetching all result pages
+MAX_CONCURRENT_FETCHES = 8
+PER_HOST_LIMIT = 2  # Concurrent requests allowed to the same host
 
 def WebSearchAgent(
     query: str,
     serp_api_key: str,
-    num_results: int = 5
+    num_results: int = 5,
+    session: requests.Session = None,
+    deadline: float = FETCH_DEADLINE,
+    max_concurrent_fetches: int = MAX_CONCURRENT_FETCHES,
+    per_host_limit: int = PER_HOST_LIMIT
 ) -> List[Dict[str, str]]:
     """
     Perform a web search using SerpApi and fetch detailed content for each result.
 
+    Result pages are fetched concurrently. Pages that have not arrived by the deadline
+    are returned as partial entries (snippet only, "partial": True) instead of
+    delaying the response.
+
     Args:
         query (str): The search query (e.g., keywords or document context).
         serp_api_key (str): Your SerpApi key.
         num_results (int): Number of search results to retrieve.
+        session (requests.Session): Pooled HTTP session used for page fetches.
+        deadline (float): Seconds allowed for fetching all result pages.
+        max_concurrent_fetches (int): Maximum number of pages fetched at once.
+        per_host_limit (int): Maximum concurrent requests to the same host.
 
     Returns:
-        List[Dict[str, str]]: List of search results with title, URL, snippet, and full content.
+        List[Dict[str, str]]: Search results in rank order with title, URL, snippet, full content and partial flag.
     """
+    http = session or requests
+
     def fetch_full_content(url: str) -> str:
         """
-        Fetches full page content from a URL using BeautifulSoup.
+        Fetches full page content from a URL through the shared fetch cache.
 
         Args:
             url (str): URL of the page to fetch.
@@ -32,13 +56,8 @@ def WebSearchAgent(
             str: Extracted full content of the page.
         """
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            # Extract content from paragraph tags
-            content = "\n".join([p.text for p in soup.find_all("p")])
-            return content
+            # Extract content from paragraph tags, reusing cached text when still valid
+            return get_fetch_cache().fetch_text(url, session=http, timeout=min(FETCH_TIMEOUT, deadline))
         except requests.RequestException as e:
             print(f"Failed to fetch content from {url}: {e}")
             return "Content not available"
@@ -61,21 +80,44 @@ def WebSearchAgent(
         print("No organic results found in the search response.")
         return []
 
-    # Process search results
+    organic_results = search_results["organic_results"]
+
+    # Fetch full content for all results concurrently, bounded per host
+    host_limits = {
+        urlparse(item["link"]).netloc: threading.BoundedSemaphore(per_host_limit)
+        for item in organic_results
+    }
+    fetch_deadline = time.monotonic() + deadline
+
+    def fetch_with_host_limit(url: str) -> str:
+        with host_limits[urlparse(url).netloc]:
+            if time.monotonic() >= fetch_deadline:
+                return None  # Waited out the deadline behind other requests to this host
+            return fetch_full_content(url)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_concurrent_fetches, len(organic_results))))
+    futures = [executor.submit(fetch_with_host_limit, item["link"]) for item in organic_results]
+    done, not_done = wait(futures, timeout=deadline)
+    # Do not wait for slow pages; their threads finish in the background
+    executor.shutdown(wait=False, cancel_futures=True)
+    if not_done:
+        print(f"{len(not_done)} result pages missed the {deadline}s deadline; returning partial entries.")
+
+    # Process search results in rank order
     results = []
-    for item in search_results["organic_results"]:
+    for item, future in zip(organic_results, futures):
         title = item["title"]
         url = item["link"]
         snippet = item.get("snippet", "")
+
+        full_content = future.result() if future in done else None
         
-        # Fetch full content
-        full_content = fetch_full_content(url)
-        
-        results._append({
+        results.append({
             "title": title,
             "url": url,
             "snippet": snippet,
-            "content": full_content
+            "content": full_content if full_content is not None else "Content not available",
+            "partial": full_content is None
         })
 
     return results